@@ -1,9 +1,16 @@
 import requests
-from bs4 import BeautifulSoup
 import csv
 import logging
 import re
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import chain
+from urllib.parse import urlparse
+
+from checkpoint import CheckpointStore
+from html_engine import DEFAULT_ENGINE, parse
+from http_client import get_client
 
 # Настройка логирования
 logging.basicConfig(
@@ -11,16 +18,51 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+BASE_URL = "http://ru-pets.ru/index.php?m=6&c=2&to=1"
+PAGE_URL = "http://ru-pets.ru/index.php?m=6&to=1&c=2&page={page}"
+# Верхняя граница частоты запросов к ru-pets.ru (запросов в секунду на все потоки);
+# фактическая частота подбирается адаптивно (rate_limiter.py)
+REQUESTS_PER_SECOND = 2.0
+
+
+class HostBudget:
+    """
+    Бюджет вежливости для одного хоста: не более max_in_flight одновременных запросов.
+    Частоту запросов подбирает адаптивный ограничитель общего HTTP-клиента.
+    """
+
+    def __init__(self, max_in_flight=4):
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    @contextmanager
+    def slot(self):
+        """Занимает место среди одновременных запросов."""
+        with self.in_flight:
+            yield
+
+
+_budgets = {}
+_budgets_lock = threading.Lock()
 
-def get_soup(url):
-    """Получает объект BeautifulSoup по URL."""
+
+def get_host_budget(url, max_in_flight=4):
+    """Возвращает общий для всех потоков бюджет хоста, к которому относится url."""
+    host = urlparse(url).netloc
+    with _budgets_lock:
+        if host not in _budgets:
+            _budgets[host] = HostBudget(max_in_flight=max_in_flight)
+        return _budgets[host]
+
+
+def get_soup(url, engine=DEFAULT_ENGINE):
+    """Получает разобранную страницу по URL (корневой узел html_engine, движок engine)."""
     try:
         logging.info("Запрос: %s", url)
-        response = requests.get(url)
+        response = get_client().get(url)
         response.raise_for_status()
         # Приводим кодировку к UTF-8, если нужно
         response.encoding = 'windows-1251'
-        return BeautifulSoup(response.text, 'html.parser')
+        return parse(response.text, engine)
     except requests.RequestException as e:
         logging.error("Ошибка при запросе %s: %s", url, e)
         return None
@@ -32,11 +74,11 @@ def extract_max_page(soup):
     Ищем в <div id='paginator'> все ссылки с параметром page.
     """
     max_page = 1
-    paginator = soup.find('div', id='paginator')
+    paginator = soup.select_one('div#paginator')
     if paginator:
-        links = paginator.find_all('a', href=True)
+        links = paginator.select('a[href]')
         for link in links:
-            href = link['href']
+            href = link.attr('href')
             match = re.search(r'page=(\d+)', href)
             if match:
                 page_num = int(match.group(1))
@@ -53,16 +95,16 @@ def parse_exhibition(div):
     - Клуб-Организатор (из текста блока <div class="msgtext">)
     """
     # Ищем ссылку с <h2>
-    a_tag = div.find('a')
+    a_tag = div.select_one('a')
     if not a_tag:
         return None
 
-    h2_tag = a_tag.find('h2')
+    h2_tag = a_tag.select_one('h2')
     if not h2_tag:
         return None
 
     # Получаем полный текст заголовка
-    full_text = h2_tag.get_text(separator=' ', strip=True)
+    full_text = h2_tag.text(separator=' ')
     # Предполагаем, что название выставки находится в кавычках «...»
     if '«' in full_text:
         date_text = full_text.split('«')[0].strip().rstrip('.,')
@@ -70,14 +112,14 @@ def parse_exhibition(div):
         date_text = full_text
 
     # Извлекаем название выставки
-    span_title = h2_tag.find('span', class_='cl-green')
-    title_text = span_title.get_text(strip=True) if span_title else ''
+    span_title = h2_tag.select_one('span.cl-green')
+    title_text = span_title.text() if span_title else ''
 
     # Извлекаем Клуб-Организатор из блока msgtext
     organizer = ""
-    msg_div = div.find('div', class_='msgtext')
+    msg_div = div.select_one('div.msgtext')
     if msg_div:
-        msg_text = msg_div.get_text(separator=' ', strip=True)
+        msg_text = msg_div.text(separator=' ')
         # Ищем подстроку вида "Клуб - Организатор: <значение>;"
         match = re.search(r'Клуб - Организатор:\s*([^;]+)', msg_text)
         if match:
@@ -91,7 +133,7 @@ def parse_exhibitions(soup):
     Извлекает список выставок со страницы (каждая выставка – из блока с классом 'listitem').
     """
     exhibitions = []
-    items = soup.find_all('div', class_='listitem')
+    items = soup.select('div.listitem')
     for item in items:
         data = parse_exhibition(item)
         if data:
@@ -99,33 +141,92 @@ def parse_exhibitions(soup):
     return exhibitions
 
 
-def main():
-    base_url = "http://ru-pets.ru/index.php?m=6&c=2&to=1"
+def page_url(page):
+    """Возвращает URL страницы каталога по её номеру."""
+    return BASE_URL if page == 1 else PAGE_URL.format(page=page)
+
+
+def fetch_pages_sequential(pages, engine=DEFAULT_ENGINE):
+    """Последовательно загружает страницы (паузы между запросами выдерживает HTTP-клиент)."""
+    for page in pages:
+        url = page_url(page)
+        logging.info("Обработка страницы %s: %s", page, url)
+        yield page, get_soup(url, engine)
+
+
+def fetch_pages_concurrent(pages, max_in_flight=4, engine=DEFAULT_ENGINE):
+    """
+    Параллельно загружает страницы пулом потоков.
+    Число одновременных запросов ограничивается бюджетом хоста (HostBudget),
+    частота – адаптивным ограничителем HTTP-клиента.
+    Результаты отдаются в порядке номеров страниц.
+    """
+    def fetch(page):
+        url = page_url(page)
+        budget = get_host_budget(url, max_in_flight)
+        with budget.slot():
+            logging.info("Обработка страницы %s: %s", page, url)
+            return page, get_soup(url, engine)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        # executor.map сохраняет порядок входных данных
+        yield from executor.map(fetch, pages)
+
+
+def main(concurrent=True, max_in_flight=4, requests_per_second=REQUESTS_PER_SECOND, engine=DEFAULT_ENGINE):
+    """
+    requests_per_second – верхняя граница частоты запросов к сайту: адаптивный ограничитель
+    (rate_limiter.py) подбирает частоту не выше неё; None – без верхней границы
+    (используется в бенчмарке на записанных ответах).
+    """
+    if requests_per_second is not None:
+        get_client().set_rate_limit(urlparse(BASE_URL).netloc, requests_per_second)
 
     # Получаем первую страницу и определяем максимальное число страниц
-    soup = get_soup(base_url)
-    if not soup:
+    first_soup = get_soup(BASE_URL, engine)
+    if not first_soup:
         logging.error("Не удалось загрузить первую страницу.")
         return
-    max_page = extract_max_page(soup)
+    max_page = extract_max_page(first_soup)
     logging.info("Найдено страниц: %s", max_page)
 
-    all_exhibitions = []
+    # Страницы, разобранные в предыдущем (прерванном) запуске, берём из контрольной точки
+    store = CheckpointStore("01_cats_exhibition")
+    done = store.done_units()
+    pending = [page for page in range(1, max_page + 1) if f"page:{page}" not in done]
+    if len(pending) < max_page:
+        logging.info("Восстановлено из контрольной точки страниц: %s", max_page - len(pending))
+
+    if concurrent:
+        # Первая страница уже загружена, остальные запрашиваем параллельно
+        first = [(1, first_soup)] if 1 in pending else []
+        rest = [page for page in pending if page != 1]
+        pages = chain(first, fetch_pages_concurrent(rest, max_in_flight, engine))
+    else:
+        pages = fetch_pages_sequential(pending, engine)
+
     # Обрабатываем все страницы
-    for page in range(1, max_page + 1):
-        if page == 1:
-            url = base_url
-        else:
-            url = f"http://ru-pets.ru/index.php?m=6&to=1&c=2&page={page}"
-        logging.info("Обработка страницы %s: %s", page, url)
-        soup = get_soup(url)
+    failed = []
+    for page, soup in pages:
         if soup:
             exhibitions = parse_exhibitions(soup)
             logging.info("Найдено выставок на странице %s: %s", page, len(exhibitions))
-            all_exhibitions.extend(exhibitions)
+            store.save(f"page:{page}", exhibitions)
+            done[f"page:{page}"] = exhibitions
         else:
             logging.error("Пропуск страницы %s из-за ошибки запроса.", page)
-        time.sleep(1)  # задержка между запросами
+            failed.append(page)
+
+    if failed:
+        # CSV без этих страниц не пишется: готовые страницы остаются в контрольной точке
+        logging.error("Не загружено страниц: %s (%s). Готовые данные сохранены в контрольной точке, "
+                      "перезапустите скрипт для продолжения.", len(failed), ", ".join(map(str, failed)))
+        logging.info(get_client().format_stats())
+        return
+
+    all_exhibitions = []
+    for page in range(1, max_page + 1):
+        all_exhibitions.extend(done.get(f"page:{page}", []))
 
     # Записываем данные в CSV
     csv_filename = "exhibitions.csv"
@@ -134,9 +235,11 @@ def main():
             writer = csv.writer(csvfile)
             writer.writerow(["Дата проведения", "Название выставки", "Клуб-Организатор"])
             writer.writerows(all_exhibitions)
+        store.clear()
         logging.info("Данные успешно сохранены в файл %s", csv_filename)
     except Exception as e:
         logging.error("Ошибка записи в CSV: %s", e)
+    logging.info(get_client().format_stats())
 
 
 if __name__ == '__main__':
@@ -1,77 +1,247 @@
 import json
+import queue
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
-def scrape_laptop_specs(url):
-    # Настройка драйвера
+from http_client import get_client
+
+# Перечень характеристик, которые нужно найти
+REQUIRED_SPECS = {
+    "Операционная система",
+    "Диагональ экрана (дюйм)",
+    "Тип матрицы",
+    "Разрешение экрана",
+    "Линейка процессоров",
+    "Процессор",
+    "Количество ядер процессора",
+    "Тактовая частота процессора",
+    "Тип оперативной памяти",
+    "Объем оперативной памяти (Гб)",
+    "Тип накопителя",
+    "Объем накопителя",
+    "Комплектация",
+    "Страна производства",
+    "Разъем HDMI",
+    "Разъем для наушн./микрофона",
+    "Разъем карт памяти",
+    "Материал корпуса",
+    "Габариты ноутбука",
+    "Вес без упаковки (кг)",
+    "Количество динамиков",
+    "Емкость аккумулятора"
+}
+
+# Карточка товара в JSON (ту же таблицу характеристик страница загружает из неё):
+# https://basket-NN.wbbasket.ru/vol{id // 100000}/part{id // 1000}/{id}/info/ru/card.json
+CARD_URL = "https://basket-{basket:02d}.wbbasket.ru/vol{vol}/part{part}/{nm}/info/ru/card.json"
+
+# Верхние границы vol (id // 100000) для корзин basket-01, basket-02, ...;
+# товары с vol больше последней границы лежат в следующей корзине
+BASKET_VOL_LIMITS = [
+    143, 287, 431, 719, 1007, 1061, 1115, 1169, 1313, 1601, 1655, 1919, 2045, 2189,
+    2405, 2621, 2837, 3053, 3269, 3485, 3701, 3917, 4133, 4349, 4565
+]
+
+# Ресурсы, которые не нужны для чтения характеристик: картинки, шрифты, стили
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.css"
+]
+
+# Все строки таблицы характеристик за один вызов execute_script: [[название, значение], ...]
+EXTRACT_SPECS_JS = """
+var text = function (node) { return node ? node.innerText.trim() : null; };
+return Array.from(document.querySelectorAll('.product-params__table .product-params__row')).map(function (row) {
+    return [text(row.querySelector('th span span')), text(row.querySelector('td span'))];
+});
+"""
+
+
+def create_driver(headless=True, block_resources=True):
+    """
+    Создаёт Chrome WebDriver.
+    headless – запуск без окна, block_resources – не загружать картинки, шрифты и CSS.
+    """
     options = webdriver.ChromeOptions()
-    options.add_argument('--start-maximized')
+    if headless:
+        options.add_argument('--headless=new')
+        options.add_argument('--window-size=1920,1080')
+    else:
+        options.add_argument('--start-maximized')
+    if block_resources:
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
     driver = webdriver.Chrome(options=options)
+    if block_resources:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URLS})
+    return driver
+
 
-    # Перечень характеристик, которые нужно найти
-    required_specs = {
-        "Операционная система",
-        "Диагональ экрана (дюйм)",
-        "Тип матрицы",
-        "Разрешение экрана",
-        "Линейка процессоров",
-        "Процессор",
-        "Количество ядер процессора",
-        "Тактовая частота процессора",
-        "Тип оперативной памяти",
-        "Объем оперативной памяти (Гб)",
-        "Тип накопителя",
-        "Объем накопителя",
-        "Комплектация",
-        "Страна производства",
-        "Разъем HDMI",
-        "Разъем для наушн./микрофона",
-        "Разъем карт памяти",
-        "Материал корпуса",
-        "Габариты ноутбука",
-        "Вес без упаковки (кг)",
-        "Количество динамиков",
-        "Емкость аккумулятора"
-    }
+def extract_specs(driver, url, timeout=15):
+    """Открывает карточку товара в готовом драйвере и возвращает нужные характеристики."""
+    driver.get(url)
+
+    # Подождать загрузки таблицы характеристик
+    WebDriverWait(driver, timeout).until(
+        EC.presence_of_element_located((By.CLASS_NAME, 'product-params__table'))
+    )
 
     collected_data = {}
+    for key, value in driver.execute_script(EXTRACT_SPECS_JS):
+        # Если характеристика в списке нужных, сохранить
+        if key in REQUIRED_SPECS and value is not None:
+            collected_data[key] = value
+    return collected_data
+
 
+def scrape_laptop_specs(url):
+    """Характеристики одной карточки в отдельном браузере с окном; результат выводится в формате JSON."""
+    driver = create_driver(headless=False, block_resources=False)
     try:
-        driver.get(url)
+        collected_data = extract_specs(driver, url)
+
+        # Вывод результата в формате JSON
+        print(json.dumps(collected_data, ensure_ascii=False, indent=4))
+        return collected_data
+
+    finally:
+        driver.quit()
 
-        # Подождать загрузки таблицы характеристик
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.CLASS_NAME, 'product-params__table'))
-        )
 
-        # Найти все строки характеристик
-        rows = driver.find_elements(By.CSS_SELECTOR, '.product-params__table .product-params__row')
+def scrape_laptop_specs_many(urls, workers=4, pages_per_driver=50, retries=1):
+    """
+    Характеристики для списка карточек через пул переиспользуемых headless-браузеров.
+    Параметры:
+      - workers: число потоков, у каждого свой драйвер
+      - pages_per_driver: после стольких страниц драйвер перезапускается (утечки памяти Chrome)
+      - retries: сколько раз повторить карточку, если драйвер упал
+    Возвращает список словарей в порядке urls (для неудачных карточек – пустой словарь).
+    """
+    tasks = queue.Queue()
+    for index, url in enumerate(urls):
+        tasks.put((index, url, 0))
+    results = [{} for _ in urls]
+    done = []
+    lock = threading.Lock()
+    started = time.monotonic()
 
-        for row in rows:
+    def worker():
+        driver = None
+        pages = 0
+        while True:
             try:
-                # Название характеристики
-                key_element = row.find_element(By.CSS_SELECTOR, 'th span span')
-                key = key_element.text.strip()
+                index, url, attempt = tasks.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if driver is None:
+                    driver = create_driver()
+                    pages = 0
+                results[index] = extract_specs(driver, url)
+                pages += 1
+            except WebDriverException as e:
+                # Драйвер мог упасть: пересоздаём его и при необходимости повторяем карточку
+                print(f"Ошибка на {url}: {e.__class__.__name__}")
+                if driver is not None:
+                    try:
+                        driver.quit()
+                    except WebDriverException:
+                        pass
+                driver = None
+                if attempt < retries:
+                    tasks.put((index, url, attempt + 1))
+                    continue
+            if driver is not None and pages >= pages_per_driver:
+                driver.quit()
+                driver = None
+            with lock:
+                done.append(index)
+                if len(done) % 10 == 0 or len(done) == len(urls):
+                    rate = len(done) / max(time.monotonic() - started, 1e-9) * 60
+                    print(f"[{len(done)}/{len(urls)}] {rate:.0f} карточек/мин")
+        if driver is not None:
+            driver.quit()
 
-                # Значение характеристики
-                value_element = row.find_element(By.CSS_SELECTOR, 'td span')
-                value = value_element.text.strip()
+    threads = [threading.Thread(target=worker) for _ in range(min(workers, len(urls)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
 
-                # Если характеристика в списке нужных, сохранить
-                if key in required_specs:
-                    collected_data[key] = value
-            except Exception as e:
-                continue
 
-        # Вывод результата в формате JSON
-        print(json.dumps(collected_data, ensure_ascii=False, indent=4))
+def product_id(url):
+    """Артикул товара (nm) из ссылки вида https://www.wildberries.ru/catalog/216378094/detail.aspx."""
+    match = re.search(r'/catalog/(\d+)', url)
+    return int(match.group(1)) if match else None
+
+
+def card_url(nm):
+    """Адрес card.json для артикула."""
+    vol = nm // 100000
+    basket = next((i + 1 for i, limit in enumerate(BASKET_VOL_LIMITS) if vol <= limit),
+                  len(BASKET_VOL_LIMITS) + 1)
+    return CARD_URL.format(basket=basket, vol=vol, part=nm // 1000, nm=nm)
+
+
+def specs_from_card(card):
+    """Оставляет из card.json только характеристики из REQUIRED_SPECS (те же ключи, что на странице)."""
+    options = list(card.get('options', []))
+    for group in card.get('grouped_options', []):
+        options.extend(group.get('options', []))
+    collected_data = {}
+    for option in options:
+        key = option.get('name')
+        if key in REQUIRED_SPECS and key not in collected_data:
+            collected_data[key] = str(option.get('value', '')).strip()
+    return collected_data
+
+
+def fetch_card_specs(nm):
+    """Характеристики товара по артикулу через card.json или None, если карточку получить не удалось."""
+    try:
+        response = get_client().get(card_url(nm), timeout=10)
+    except Exception as e:
+        print(f"Ошибка запроса card.json для {nm}: {e}")
+        return None
+    if response.status_code != 200:
+        return None
+    try:
+        return specs_from_card(response.json())
+    except ValueError:
+        return None
+
+
+def scrape_laptop_specs_api(urls, workers=16, fallback=True):
+    """
+    Характеристики для списка карточек без браузера: card.json запрашиваются параллельно.
+    Карточки, для которых JSON получить не удалось, при fallback=True собираются
+    через Selenium (scrape_laptop_specs_many). Возвращает список словарей в порядке urls.
+    """
+    ids = [product_id(url) for url in urls]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda nm: fetch_card_specs(nm) if nm else None, ids))
+
+    failed = [i for i, specs in enumerate(results) if not specs]
+    if failed:
+        print(f"card.json недоступен для {len(failed)} из {len(urls)} карточек")
+        if fallback:
+            browser_results = scrape_laptop_specs_many([urls[i] for i in failed])
+            for i, specs in zip(failed, browser_results):
+                results[i] = specs
+    print(get_client().format_stats())
+    return [specs or {} for specs in results]
 
-    finally:
-        driver.quit()
 
-# Запуск функции
-scrape_laptop_specs('https://www.wildberries.ru/catalog/216378094/detail.aspx')
+if __name__ == "__main__":
+    # Запуск функции: сначала card.json, браузер – только если JSON недоступен
+    specs = scrape_laptop_specs_api(['https://www.wildberries.ru/catalog/216378094/detail.aspx'])[0]
+    print(json.dumps(specs, ensure_ascii=False, indent=4))
@@ -8,9 +8,14 @@ from selenium.common.exceptions import (
     TimeoutException,
     ElementClickInterceptedException
 )
+from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
 import time
-import csv
 import logging
+from urllib.parse import urlparse
+
+from http_client import get_client
+from sinks import CsvSink
 
 # --- Логирование ---
 logging.basicConfig(
@@ -19,6 +24,45 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+LISTING_URL = "https://zoon.ru/tomsk/restaurants/"
+# Эндпоинт, который вызывает кнопка «Показать ещё»: возвращает фрагмент списка карточек
+# (JSON с HTML в поле "html" или сам HTML) для страницы page
+FAST_PATH_URL = "https://zoon.ru/js.php"
+FAST_PATH_PARAMS = {
+    "area": "service",
+    "action": "CatalogList",
+    "need[]": "items",
+    "search_query_form": 1,
+    "city": "tomsk",
+    "category": "restaurants",
+}
+# Предел числа страниц быстрого пути: эндпоинт подобран вручную, и без предела
+# неверный ответ (без пустой страницы в конце) зациклил бы загрузку
+FAST_PATH_MAX_PAGES = 200
+# Разбор HTML: дерево строит lxml (быстрее встроенного html.parser)
+HTML_PARSER = "lxml"
+
+# Извлечение всех карточек за один вызов execute_script вместо обращений к драйверу по каждому полю
+EXTRACT_CARDS_JS = """
+var text = function (node) { return node ? node.innerText : ''; };
+return Array.from(document.querySelectorAll('li.minicard-item.js-results-item')).map(function (el) {
+    var feat = el.querySelector('.minicard-item__features');
+    return {
+        name: text(el.querySelector('.minicard-item__title .title-link')),
+        rating: text(el.querySelector('.minicard-item__rating .z-text--bold')),
+        links: feat ? Array.from(feat.querySelectorAll('a')).map(text) : [],
+        spans: feat ? Array.from(feat.querySelectorAll('span:not(.price-category):not(.bullet)')).map(text) : []
+    };
+});
+"""
+
+FAST_PATH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "X-Requested-With": "XMLHttpRequest",
+    "Referer": LISTING_URL,
+}
+
 def init_driver():
     logger.info("Инициализация headless Chrome WebDriver")
     options = Options()
@@ -29,9 +73,15 @@ def init_driver():
     driver.set_window_size(1920, 1080)
     return driver
 
-def load_all_pages(driver, timeout=30, pause=2):
+def load_all_pages(driver, timeout=30):
+    """
+    Жмёт «Показать ещё», пока кнопка есть. Вместо фиксированной паузы между нажатиями
+    частоту задаёт адаптивный ограничитель HTTP-клиента для zoon.ru: время подгрузки
+    очередной порции сообщается ему как время ответа.
+    """
     logger.info("Начинаем подгрузку всех страниц через кнопку 'Показать ещё'")
     wait = WebDriverWait(driver, timeout)
+    limiter = get_client().limiter_for(urlparse(LISTING_URL).netloc)
     wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "li.minicard-item.js-results-item")))
     last_count = len(driver.find_elements(By.CSS_SELECTOR, "li.minicard-item.js-results-item"))
 
@@ -49,6 +99,9 @@ def load_all_pages(driver, timeout=30, pause=2):
                 logger.debug("Прелоадер всё ещё на странице (таймаут)")
 
             # Пробуем обычный клик
+            if limiter is not None:
+                limiter.acquire()
+            clicked = time.monotonic()
             try:
                 wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "span.js-next-page")))
                 logger.info("Кликаем по кнопке обычным click()")
@@ -58,8 +111,9 @@ def load_all_pages(driver, timeout=30, pause=2):
                 driver.execute_script("arguments[0].click();", btn)
 
             # Ждём загрузки новых элементов
-            time.sleep(pause)
             wait.until(lambda d: len(d.find_elements(By.CSS_SELECTOR, "li.minicard-item.js-results-item")) > last_count)
+            if limiter is not None:
+                limiter.record(200, time.monotonic() - clicked)  # порция подгружена успешно
             current_count = len(driver.find_elements(By.CSS_SELECTOR, "li.minicard-item.js-results-item"))
             logger.info(f"Новое количество карточек: {current_count}")
             last_count = current_count
@@ -68,10 +122,10 @@ def load_all_pages(driver, timeout=30, pause=2):
             logger.info("Кнопка 'Показать ещё' недоступна — пагинация завершена")
             break
 
-def parse_restaurants(driver):
+def iter_restaurants(driver):
+    """Разбирает карточки ресторанов по одной (генератор строк для потоковой записи)."""
     logger.info("Парсим рестораны")
     elems = driver.find_elements(By.CSS_SELECTOR, "li.minicard-item.js-results-item")
-    data = []
     for idx, el in enumerate(elems, start=1):
         logger.info(f"Парсим #{idx}")
         try:
@@ -94,32 +148,141 @@ def parse_restaurants(driver):
                     directions.insert(0, txt)
         except:
             pass
-        data.append({
+        yield {
             "Название": name,
             "Рейтинг": rating,
             "Направления": ";".join(directions)
-        })
+        }
+
+def _make_row(name, rating, links, spans):
+    """Собирает строку результата из текстов карточки по тем же правилам, что и iter_restaurants."""
+    directions = [a.strip() for a in links]
+    for sp in spans:
+        txt = sp.strip()
+        if txt and txt not in directions:
+            directions.insert(0, txt)
+    return {
+        "Название": name.strip(),
+        "Рейтинг": rating.replace(",", ".").strip(),
+        "Направления": ";".join(directions)
+    }
+
+def parse_restaurants(driver, mode="script"):
+    """
+    Разбирает все карточки на открытой странице.
+    mode:
+      - "script": один вызов execute_script возвращает все карточки массивом;
+      - "source": один запрос driver.page_source и разбор HTML без браузера;
+      - "webdriver": find_element/.text по каждому полю (несколько обращений к драйверу на карточку).
+    """
+    if mode == "script":
+        data = [_make_row(**card) for card in driver.execute_script(EXTRACT_CARDS_JS)]
+    elif mode == "source":
+        data = parse_restaurants_html(driver.page_source)
+    else:
+        data = list(iter_restaurants(driver))
     logger.info(f"Всего заведений: {len(data)}")
     return data
 
-def save_to_csv(data, filename="tomsk_restaurants.csv"):
+def _text(el):
+    """Видимый текст элемента с нормализованными пробелами (как .text в Selenium)."""
+    return " ".join(el.get_text().split()) if el else ""
+
+def parse_restaurants_html(html):
+    """
+    Разбирает карточки ресторанов из HTML (страницы или фрагмента списка).
+    Возвращает строки в том же формате, что и parse_restaurants.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    data = []
+    for el in soup.select("li.minicard-item.js-results-item"):
+        feat = el.select_one(".minicard-item__features")
+        data.append(_make_row(
+            name=_text(el.select_one(".minicard-item__title .title-link")),
+            rating=_text(el.select_one(".minicard-item__rating .z-text--bold")),
+            links=[_text(a) for a in feat.select("a")] if feat else [],
+            spans=[_text(sp) for sp in feat.select("span:not(.price-category):not(.bullet)")] if feat else []
+        ))
+    return data
+
+def fetch_listing_page(page):
+    """Запрашивает фрагмент списка для страницы page напрямую, без браузера."""
+    params = dict(FAST_PATH_PARAMS, page=page)
+    response = get_client().get(FAST_PATH_URL, params=params, headers=FAST_PATH_HEADERS)
+    response.raise_for_status()
+    try:
+        html = response.json().get("html", "")
+    except ValueError:
+        html = response.text
+    return parse_restaurants_html(html)
+
+def load_all_fast(workers=4, max_pages=FAST_PATH_MAX_PAGES):
+    """
+    Быстрый путь: загружает страницы списка пачками по workers штук параллельно
+    до первой пустой страницы или страницы, на которой нет ни одной новой карточки
+    (эндпоинт может не учитывать page и отдавать одно и то же). Строки возвращаются
+    в порядке страниц. Если за max_pages страниц конец списка не найден, выбрасывает
+    RuntimeError – main() в этом случае переходит на Selenium.
+    """
+    logger.info("Быстрый путь: загрузка списка через эндпоинт пагинации")
+    data = []
+    seen = set()
+    page = 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while page <= max_pages:
+            pages = range(page, min(page + workers, max_pages + 1))
+            for number, rows in zip(pages, executor.map(fetch_listing_page, pages)):
+                if not rows:
+                    logger.info(f"Страница {number} пуста — список загружен, карточек: {len(data)}")
+                    return data
+                new_rows = [row for row in rows if tuple(row.values()) not in seen]
+                if not new_rows:
+                    logger.info(f"На странице {number} нет новых карточек — список загружен, "
+                                f"карточек: {len(data)}")
+                    return data
+                seen.update(tuple(row.values()) for row in new_rows)
+                data.extend(new_rows)
+            page += workers
+    raise RuntimeError(f"конец списка не найден за {max_pages} страниц")
+
+def scrape_with_selenium():
+    """Медленный путь через браузер: нажатие «Показать ещё» до конца списка и запись в CSV."""
+    driver = init_driver()
+    try:
+        driver.get(LISTING_URL)
+        logger.info("Открыта страница ресторанов Томска")
+        load_all_pages(driver, timeout=60)
+        save_to_csv(parse_restaurants(driver))
+    finally:
+        driver.quit()
+        logger.info("Драйвер закрыт")
+
+def save_to_csv(data, filename="tomsk_restaurants.csv", batch_size=100):
+    """Записывает строки в CSV по мере поступления (data может быть генератором)."""
     logger.info(f"Сохраняем CSV: {filename}")
-    with open(filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["Название", "Рейтинг", "Направления"])
-        writer.writeheader()
-        writer.writerows(data)
-    logger.info("CSV успешно сохранён")
+    with CsvSink(filename, fieldnames=["Название", "Рейтинг", "Направления"], batch_size=batch_size) as sink:
+        sink.write_many(data)
+    logger.info(f"CSV успешно сохранён, всего заведений: {sink.count}")
 
-def main():
+def main(fast=True, workers=4):
+    """
+    fast=True – сначала быстрый путь (HTTP-запросы к эндпоинту пагинации),
+    при ошибке или пустом результате – Selenium. fast=False – сразу Selenium.
+    """
     logger.info("Старт скрипта")
-    driver = init_driver()
-    driver.get("https://zoon.ru/tomsk/restaurants/")
-    logger.info("Открыта страница ресторанов Томска")
-    load_all_pages(driver, timeout=60, pause=3)
-    restaurants = parse_restaurants(driver)
-    save_to_csv(restaurants)
-    driver.quit()
-    logger.info("Драйвер закрыт, работа завершена")
+    restaurants = None
+    if fast:
+        try:
+            restaurants = load_all_fast(workers)
+        except Exception as e:
+            logger.warning(f"Быстрый путь не сработал: {e}")
+        if not restaurants:
+            logger.warning("Переходим на Selenium")
+    if restaurants:
+        save_to_csv(restaurants)
+    else:
+        scrape_with_selenium()
+    logger.info("Работа завершена")
 
 if __name__ == "__main__":
     main()
@@ -3,9 +3,25 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from bs4 import BeautifulSoup
 import time
 import csv
 
+# Извлечение всех карточек за один вызов execute_script вместо обращений к драйверу по каждому полю
+EXTRACT_CARDS_JS = """
+return Array.from(document.querySelectorAll('li.minicard-item.js-results-item')).map(function (el) {
+    var texts = function (selector) {
+        return Array.from(el.querySelectorAll(selector)).map(function (node) { return node.innerText; });
+    };
+    return {
+        name: el.querySelector('.minicard-item__title .title-link').innerText,
+        rating: el.querySelector('.minicard-item__rating .z-text--bold').innerText,
+        features: texts('.minicard-item__features a'),
+        spans: texts('.minicard-item__features span:not(.price-category):not(.bullet)')
+    };
+});
+"""
+
 # Инициализация браузера в режиме без окна (headless)
 def init_driver():
     options = Options()
@@ -15,8 +31,43 @@ def init_driver():
     return driver
 
 
-# Парсим названия, рейтинги и направления у всех карточек ресторанов
-def parse_restaurants(driver):
+# Собираем строку результата из текстов карточки
+def make_row(name, rating, features, spans):
+    directions = [text for text in features + spans if text]
+    return {
+        "Название": name,
+        "Рейтинг": rating.replace(",", "."),
+        "Направления": ";".join(directions)
+    }
+
+
+# Видимый текст элемента с нормализованными пробелами (как .text в Selenium)
+def element_text(el):
+    return " ".join(el.get_text().split())
+
+
+# Парсим карточки из готового HTML (например, driver.page_source) без обращений к браузеру
+def parse_restaurants_html(html):
+    soup = BeautifulSoup(html, "lxml")
+    data = []
+    for item in soup.select("li.minicard-item.js-results-item"):
+        data.append(make_row(
+            name=element_text(item.select_one(".minicard-item__title .title-link")),
+            rating=element_text(item.select_one(".minicard-item__rating .z-text--bold")),
+            features=[element_text(f) for f in item.select(".minicard-item__features a")],
+            spans=[element_text(s) for s in item.select(".minicard-item__features span:not(.price-category):not(.bullet)")]
+        ))
+    return data
+
+
+# Парсим названия, рейтинги и направления у всех карточек ресторанов.
+# mode="script" – один вызов execute_script, "source" – разбор driver.page_source,
+# "webdriver" – отдельные find_element/.text по каждому полю карточки
+def parse_restaurants(driver, mode="script"):
+    if mode == "script":
+        return [make_row(**card) for card in driver.execute_script(EXTRACT_CARDS_JS)]
+    if mode == "source":
+        return parse_restaurants_html(driver.page_source)
     items = driver.find_elements(By.CSS_SELECTOR, "li.minicard-item.js-results-item")
     data = []
     for item in items:
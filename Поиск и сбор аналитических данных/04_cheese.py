@@ -4,62 +4,107 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 import time
 import csv
+from urllib.parse import urlparse
 
-# Настройки браузера
-options = Options()
-options.add_argument('--headless')  # Для запуска без интерфейса
-options.add_argument('--no-sandbox')
-options.add_argument('--disable-dev-shm-usage')
+from html_engine import DEFAULT_ENGINE, parse
+from http_client import get_client
 
-# Запуск драйвера
-print("[INFO] Запуск браузера...")
-driver = webdriver.Chrome(options=options)
-driver.get('https://pro-syr.ru/zakvaski-dlya-syra/mezofilnye/')
-print("[INFO] Открыта страница с мезофильными заквасками.")
+CATALOG_URL = 'https://pro-syr.ru/zakvaski-dlya-syra/mezofilnye/'
+CSV_FILE = 'zakvaski_prosyr_full.csv'
 
-# Нажатие кнопки "Показать еще", пока она присутствует
-while True:
+
+def load_full_catalog(url=CATALOG_URL):
+    """
+    Открывает каталог, нажимает "Показать еще", пока кнопка есть, и возвращает HTML страницы.
+    Пауза между нажатиями не фиксирована: ждём появления новых карточек, а частоту нажатий
+    задаёт адаптивный ограничитель HTTP-клиента для pro-syr.ru.
+    """
+    # Настройки браузера
+    options = Options()
+    options.add_argument('--headless')  # Для запуска без интерфейса
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+
+    # Запуск драйвера
+    print("[INFO] Запуск браузера...")
+    driver = webdriver.Chrome(options=options)
+    limiter = get_client().limiter_for(urlparse(url).netloc)
     try:
-        print("[INFO] Поиск кнопки 'Показать еще'...")
-        show_more_button = WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, '.next_button_div a'))
-        )
-        print("[INFO] Кнопка найдена. Нажатие...")
-        driver.execute_script("arguments[0].click();", show_more_button)
-        time.sleep(2)  # Дать время подгрузке
-    except:
-        print("[INFO] Кнопка 'Показать еще' не найдена или товары загружены полностью.")
-        break
-
-# Получение HTML после полной загрузки
-print("[INFO] Сбор HTML-кода страницы...")
-soup = BeautifulSoup(driver.page_source, 'html.parser')
-driver.quit()
-
-# Поиск карточек товаров
-products = soup.find_all('div', class_='product-layout')
-print(f"[INFO] Найдено товаров: {len(products)}")
-
-# Запись в CSV
-csv_file = 'zakvaski_prosyr_full.csv'
-with open(csv_file, 'w', newline='', encoding='utf-8') as file:
-    writer = csv.writer(file)
-    writer.writerow(['Название продукта', 'Цена', 'Наличие'])
-
-    for index, product in enumerate(products, start=1):
-        name_tag = product.find('div', class_='nameproduct')
-        name = name_tag.get_text(strip=True) if name_tag else 'Нет данных'
-
-        price_tag = product.find('p', class_='price')
-        price = price_tag.get_text(strip=True) if price_tag else 'Нет данных'
-
-        button = product.find('button', string=lambda s: s and 'В корзину' in s)
+        driver.get(url)
+        print("[INFO] Открыта страница с мезофильными заквасками.")
+
+        # Нажатие кнопки "Показать еще", пока она присутствует
+        while True:
+            try:
+                print("[INFO] Поиск кнопки 'Показать еще'...")
+                show_more_button = WebDriverWait(driver, 5).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, '.next_button_div a'))
+                )
+                print("[INFO] Кнопка найдена. Нажатие...")
+                products_before = len(driver.find_elements(By.CSS_SELECTOR, 'div.product-layout'))
+                if limiter is not None:
+                    limiter.acquire()
+                clicked = time.monotonic()
+                driver.execute_script("arguments[0].click();", show_more_button)
+                # Дать время подгрузке: ждём новых карточек
+                WebDriverWait(driver, 10).until(
+                    lambda d: len(d.find_elements(By.CSS_SELECTOR, 'div.product-layout')) > products_before
+                )
+                if limiter is not None:
+                    limiter.record(200, time.monotonic() - clicked)
+            except:
+                print("[INFO] Кнопка 'Показать еще' не найдена или товары загружены полностью.")
+                break
+
+        # Получение HTML после полной загрузки
+        print("[INFO] Сбор HTML-кода страницы...")
+        return driver.page_source
+    finally:
+        driver.quit()
+
+
+def parse_products(html, engine=DEFAULT_ENGINE):
+    """Список строк [название, цена, наличие] по карточкам div.product-layout."""
+    soup = parse(html, engine)
+    rows = []
+    for product in soup.select('div.product-layout'):
+        name_tag = product.select_one('div.nameproduct')
+        name = name_tag.text() if name_tag else 'Нет данных'
+
+        price_tag = product.select_one('p.price')
+        price = price_tag.text() if price_tag else 'Нет данных'
+
+        button = any('В корзину' in tag.text(strip=False) for tag in product.select('button'))
         availability = 'В наличии' if button else 'Нет в наличии'
 
-        print(f"[{index}] {name} | {price} | {availability}")
-        writer.writerow([name, price, availability])
+        rows.append([name, price, availability])
+    return rows
+
+
+def save_to_csv(rows, csv_file=CSV_FILE):
+    """Запись в CSV с выводом каждой строки в stdout."""
+    with open(csv_file, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Название продукта', 'Цена', 'Наличие'])
+
+        for index, (name, price, availability) in enumerate(rows, start=1):
+            print(f"[{index}] {name} | {price} | {availability}")
+            writer.writerow([name, price, availability])
+
+    print(f"[INFO] Данные успешно сохранены в файл {csv_file}")
+
+
+def main(engine=DEFAULT_ENGINE):
+    html = load_full_catalog()
+
+    # Поиск карточек товаров
+    rows = parse_products(html, engine)
+    print(f"[INFO] Найдено товаров: {len(rows)}")
+
+    save_to_csv(rows)
+
 
-print(f"[INFO] Данные успешно сохранены в файл {csv_file}")
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,20 @@
 # Инструменты парсинга:
 # Selenium используется для автоматизации браузера и загрузки динамического контента (прокрутка страницы, подгрузка статей).
-# BeautifulSoup применяется для парсинга HTML-кода и извлечения нужных данных из DOM после полной загрузки страницы.
+# BeautifulSoup (или selectolax — движок выбирается через html_engine) применяется для парсинга HTML-кода и извлечения нужных данных из DOM после полной загрузки страницы.
 # Такой подход позволяет обрабатывать сайты с динамической подгрузкой контента через JavaScript, как у tproger.ru.
 
 
 import time
 import logging
-import csv
 from datetime import datetime, timedelta, timezone
-from bs4 import BeautifulSoup
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+
+from html_engine import DEFAULT_ENGINE, parse
+from http_client import get_client
+from sinks import CsvSink
 
 # Настройка логгера
 logger = logging.getLogger(__name__)
@@ -23,6 +27,40 @@ logger.addHandler(handler)
 # Создание объекта временной зоны UTC+3
 utc_plus_3 = timezone(timedelta(hours=3))
 
+# Сколько ждать подгрузки статей после прокрутки, прежде чем считать, что лента закончилась (сек)
+SCROLL_TIMEOUT = 5
+
+# Возвращает данные карточек, начиная с индекса arguments[0], т.е. только добавленные после прошлого вызова.
+# Текст собирается как get_text(strip=True) в BeautifulSoup: обрезанные текстовые узлы без разделителя.
+NEW_CARDS_JS = """
+var strippedText = function (node) {
+    if (!node) { return null; }
+    var walker = document.createTreeWalker(node, NodeFilter.SHOW_TEXT);
+    var parts = [];
+    while (walker.nextNode()) {
+        var text = walker.currentNode.nodeValue.trim();
+        if (text) { parts.push(text); }
+    }
+    return parts.join('');
+};
+var cards = document.querySelectorAll('.tp-ui-post-card');
+var result = [];
+for (var i = arguments[0]; i < cards.length; i++) {
+    var card = cards[i];
+    var time = card.querySelector('time');
+    var title = card.querySelector('.tp-ui-post-card__title a');
+    result.push({
+        datetime: time ? time.getAttribute('datetime') : null,
+        title: strippedText(title),
+        href: title ? title.getAttribute('href') : null,
+        description: strippedText(card.querySelector('.tp-ui-post-card__description')),
+        likes: strippedText(card.querySelector('.tp-ui-post-card__action-entity--like .tp-ui-post-card__action-entity-text')),
+        comments: strippedText(card.querySelector('.tp-ui-post-card__action-entity--comments .tp-ui-post-card__action-entity-text'))
+    });
+}
+return result;
+"""
+
 def get_date_range():
     """Получение диапазона дат за последние 2 месяца"""
     end_date = datetime.now(utc_plus_3).replace(hour=23, minute=59, second=59)
@@ -30,55 +68,132 @@ def get_date_range():
     logger.debug(f"Диапазон дат: {start_date} - {end_date}")
     return start_date, end_date
 
-def scroll_to_load_all_articles(driver, start_date):
+def scroll_and_wait(driver, last_height, timeout=SCROLL_TIMEOUT):
+    """
+    Прокрутка вниз с ожиданием подгрузки: возвращает новую высоту страницы, как только она
+    изменилась, или прежнюю, если за timeout ничего не подгрузилось.
+    Частоту прокруток задаёт адаптивный ограничитель HTTP-клиента для tproger.ru
+    (время подгрузки сообщается ему как время ответа) вместо фиксированной паузы.
+    """
+    limiter = get_client().limiter_for("tproger.ru")
+    if limiter is not None:
+        limiter.acquire()
+    started = time.monotonic()
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.2).until(
+            lambda d: d.execute_script("return document.body.scrollHeight") != last_height
+        )
+    except TimeoutException:
+        return last_height
+    if limiter is not None:
+        limiter.record(200, time.monotonic() - started)
+    return driver.execute_script("return document.body.scrollHeight")
+
+def scroll_to_load_all_articles(driver, start_date, engine=DEFAULT_ENGINE):
     """Прокрутка страницы вниз до загрузки всех статей в заданном диапазоне дат"""
-    SCROLL_PAUSE_TIME = 2
     last_height = driver.execute_script("return document.body.scrollHeight")
     logger.info("Начало прокрутки страницы для загрузки всех статей.")
     while True:
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(SCROLL_PAUSE_TIME)
-        new_height = driver.execute_script("return document.body.scrollHeight")
+        new_height = scroll_and_wait(driver, last_height)
         if new_height == last_height:
             logger.debug("Достигнут конец страницы.")
             break
         last_height = new_height
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        soup = parse(driver.page_source, engine)
         articles = soup.select('.tp-ui-post-card')
         if articles:
             last_article = articles[-1]
             date_element = last_article.select_one('time')
-            if date_element and date_element.has_attr('datetime'):
-                article_date = datetime.fromisoformat(date_element['datetime'])
+            if date_element and date_element.attr('datetime') is not None:
+                article_date = datetime.fromisoformat(date_element.attr('datetime'))
                 if article_date < start_date:
                     logger.debug(f"Дата последней статьи {article_date} раньше начальной даты {start_date}.")
                     break
     logger.info("Прокрутка страницы завершена.")
 
-def parse_articles(driver, start_date, end_date):
+def card_to_row(card, start_date, end_date):
+    """Строка результата из данных карточки (NEW_CARDS_JS) или None, если статья вне диапазона дат"""
+    if not card['datetime']:
+        return None
+    article_date = datetime.fromisoformat(card['datetime'])
+    if not (start_date <= article_date <= end_date):
+        return None
+    return {
+        'url': 'https://tproger.ru' + card['href'] if card['href'] is not None else '',
+        'date': article_date.strftime('%Y-%m-%d %H:%M:%S'),
+        'title': card['title'] or '',
+        'description': card['description'] or '',
+        'likes': int(card['likes']) if card['likes'] is not None else 0,
+        'comments': int(card['comments']) if card['comments'] is not None else 0
+    }
+
+def collect_articles_incremental(driver, start_date, end_date):
+    """
+    Прокрутка с разбором только новых карточек после каждого шага.
+    Статьи накапливаются по ходу прокрутки, остановка — на первой карточке старше start_date
+    или в конце страницы. Отдельный разбор всей страницы после прокрутки не нужен.
+    """
+    logger.info("Начало инкрементальной прокрутки и парсинга статей.")
+    data = []
+    seen = 0
+    at_end = False
+    last_height = driver.execute_script("return document.body.scrollHeight")
+    while True:
+        cards = driver.execute_script(NEW_CARDS_JS, seen)
+        seen += len(cards)
+        reached_start = False
+        for card in cards:
+            try:
+                if card['datetime'] and datetime.fromisoformat(card['datetime']) < start_date:
+                    reached_start = True
+                row = card_to_row(card, start_date, end_date)
+                if row:
+                    data.append(row)
+                    logger.debug(f"Добавлена статья: {row['title']}")
+            except Exception as e:
+                logger.exception(f"Ошибка при обработке статьи: {e}")
+        if reached_start:
+            logger.debug(f"Найдена статья старше начальной даты {start_date}.")
+            break
+        if at_end:
+            logger.debug("Достигнут конец страницы.")
+            break
+        new_height = scroll_and_wait(driver, last_height)
+        # Если высота не изменилась, разбираем оставшиеся карточки ещё одним проходом и завершаем
+        at_end = new_height == last_height
+        last_height = new_height
+    logger.info(f"Парсинг завершен. Карточек просмотрено: {seen}, найдено статей: {len(data)}")
+    return data
+
+def parse_articles(driver, start_date, end_date, engine=DEFAULT_ENGINE):
     """Парсинг статей в заданном диапазоне дат"""
     logger.info("Начало парсинга статей.")
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
+    return parse_articles_html(driver.page_source, start_date, end_date, engine)
+
+def parse_articles_html(html, start_date, end_date, engine=DEFAULT_ENGINE):
+    """Парсинг статей из HTML страницы (движок разбора – engine из html_engine)"""
+    soup = parse(html, engine)
     articles = soup.select('.tp-ui-post-card')
     data = []
     for article in articles:
         try:
             date_element = article.select_one('time')
-            if date_element and date_element.has_attr('datetime'):
-                article_date = datetime.fromisoformat(date_element['datetime'])
+            if date_element and date_element.attr('datetime') is not None:
+                article_date = datetime.fromisoformat(date_element.attr('datetime'))
                 if not (start_date <= article_date <= end_date):
                     continue
             else:
                 continue
             title_element = article.select_one('.tp-ui-post-card__title a')
-            title = title_element.get_text(strip=True) if title_element else ''
-            url = 'https://tproger.ru' + title_element['href'] if title_element and title_element.has_attr('href') else ''
+            title = title_element.text() if title_element else ''
+            url = 'https://tproger.ru' + title_element.attr('href') if title_element and title_element.attr('href') is not None else ''
             description_element = article.select_one('.tp-ui-post-card__description')
-            description = description_element.get_text(strip=True) if description_element else ''
+            description = description_element.text() if description_element else ''
             likes_element = article.select_one('.tp-ui-post-card__action-entity--like .tp-ui-post-card__action-entity-text')
-            likes = int(likes_element.get_text(strip=True)) if likes_element else 0
+            likes = int(likes_element.text()) if likes_element else 0
             comments_element = article.select_one('.tp-ui-post-card__action-entity--comments .tp-ui-post-card__action-entity-text')
-            comments = int(comments_element.get_text(strip=True)) if comments_element else 0
+            comments = int(comments_element.text()) if comments_element else 0
             data.append({
                 'url': url,
                 'date': article_date.strftime('%Y-%m-%d %H:%M:%S'),
@@ -93,20 +208,22 @@ def parse_articles(driver, start_date, end_date):
     logger.info(f"Парсинг завершен. Найдено статей: {len(data)}")
     return data
 
-def save_to_csv(data):
-    """Сохранение данных в CSV файл"""
+def save_to_csv(data, batch_size=100):
+    """Потоковое сохранение данных в CSV файл (data может быть генератором)"""
     filename = f"tproger_articles_{datetime.now().strftime('%Y%m%d')}.csv"
     try:
-        with open(filename, mode='w', encoding='utf-8', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=['url', 'date', 'title', 'description', 'likes', 'comments'])
-            writer.writeheader()
-            for row in data:
-                writer.writerow(row)
+        fieldnames = ['url', 'date', 'title', 'description', 'likes', 'comments']
+        with CsvSink(filename, fieldnames=fieldnames, batch_size=batch_size) as sink:
+            sink.write_many(data)
         logger.info(f"Данные сохранены в файл {filename}")
     except Exception as e:
         logger.exception(f"Ошибка при сохранении данных в CSV: {e}")
 
-def main():
+def main(incremental=True, engine=DEFAULT_ENGINE):
+    """
+    incremental=True – разбор новых карточек по ходу прокрутки, False – прокрутка, затем разбор всей страницы
+    (engine – движок разбора HTML для второго режима)
+    """
     start_date, end_date = get_date_range()
     logger.info("Запуск парсера Tproger")
     options = Options()
@@ -116,8 +233,11 @@ def main():
     try:
         driver.get("https://tproger.ru/")
         logger.info("Открытие главной страницы Tproger")
-        scroll_to_load_all_articles(driver, start_date)
-        articles_data = parse_articles(driver, start_date, end_date)
+        if incremental:
+            articles_data = collect_articles_incremental(driver, start_date, end_date)
+        else:
+            scroll_to_load_all_articles(driver, start_date, engine)
+            articles_data = parse_articles(driver, start_date, end_date, engine)
         if articles_data:
             save_to_csv(articles_data)
         else:
@@ -0,0 +1,95 @@
+"""
+Сравнение движков разбора HTML (html_engine.py) на сохранённых страницах.
+
+Для каждой фикстуры карточки размножаются до заданного числа, и страница разбирается
+функциями извлечения сборщиков с каждым из движков:
+  - parse_exhibitions (01_cats_exhibition.py) на fixtures/ru_pets_exhibitions.html;
+  - parse_products (04_cheese.py, цикл по div.product-layout) на fixtures/prosyr_mezofilnye.html;
+  - parse_articles_html (06_final_tpoger.py) на fixtures/tproger_feed.html.
+Печатается время разбора страницы (разбор дерева + извлечение строк) и время на карточку.
+Строки каждого движка сравниваются с результатом "html.parser": при расхождении
+выводится предупреждение и скрипт завершается с кодом 1.
+
+Запуск: python bench_html_engines.py [число карточек] [повторов]
+"""
+import importlib
+import logging
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from html_engine import ENGINES, LexborHTMLParser, parse
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+# Фикстура и регулярное выражение для одной карточки (карточки начинаются и заканчиваются с начала строки)
+CARD_PATTERNS = {
+    "ru_pets_exhibitions.html": r'^<div class="listitem">.*?^</div>$',
+    "prosyr_mezofilnye.html": r'^<div class="product-layout.*?^</div>$',
+    "tproger_feed.html": r'^<article class="tp-ui-post-card">.*?^</article>$',
+}
+
+
+def build_page(fixture, cards):
+    """Размножает карточки фикстуры до нужного количества и возвращает HTML страницы."""
+    html = (FIXTURES / fixture).read_text(encoding="utf-8")
+    items = re.findall(CARD_PATTERNS[fixture], html, flags=re.S | re.M)
+    repeated = [items[i % len(items)] for i in range(cards)]
+    start = html.index(items[0])
+    end = html.index(items[-1]) + len(items[-1])
+    return html[:start] + "\n".join(repeated) + html[end:]
+
+
+def extractors():
+    """Функции извлечения: имя -> (фикстура, функция(html, engine) -> строки)."""
+    cats = importlib.import_module("01_cats_exhibition")
+    cheese = importlib.import_module("04_cheese")
+    tproger = importlib.import_module("06_final_tpoger")
+    all_dates = (datetime.min.replace(tzinfo=timezone.utc), datetime.max.replace(tzinfo=timezone.utc))
+
+    def exhibitions(html, engine):
+        soup = parse(html, engine)
+        return cats.extract_max_page(soup), cats.parse_exhibitions(soup)
+
+    return {
+        "parse_exhibitions": ("ru_pets_exhibitions.html", exhibitions),
+        "parse_products": ("prosyr_mezofilnye.html", cheese.parse_products),
+        "parse_articles_html": ("tproger_feed.html",
+                                lambda html, engine: tproger.parse_articles_html(html, *all_dates, engine)),
+    }
+
+
+def main(cards=500, repeats=5):
+    logging.disable(logging.INFO)
+    engines = [engine for engine in ENGINES if engine != "selectolax" or LexborHTMLParser is not None]
+    mismatches = 0
+    print(f"Карточек на странице: {cards}, повторов: {repeats}")
+    print(f"{'функция':<22}{'движок':<13}{'мс/страницу':>13}{'мкс/карточку':>15}{'ускорение':>11}")
+    for name, (fixture, extract) in extractors().items():
+        html = build_page(fixture, cards)
+        baseline = None
+        baseline_time = None
+        for engine in engines:
+            best = None
+            for _ in range(repeats):
+                started = time.perf_counter()
+                rows = extract(html, engine)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            if baseline is None:
+                baseline, baseline_time = rows, best
+            elif rows != baseline:
+                mismatches += 1
+                print(f"  ВНИМАНИЕ: движок {engine} даёт строки, отличные от html.parser")
+            print(f"{name:<22}{engine:<13}{best * 1e3:>13.1f}{best / cards * 1e6:>15.1f}"
+                  f"{baseline_time / best:>10.1f}x")
+    if mismatches:
+        sys.exit(1)
+    print("Все движки дают одинаковые строки.")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 5)
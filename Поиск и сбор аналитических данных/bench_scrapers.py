@@ -0,0 +1,242 @@
+"""
+Бенчмарк сборщиков без сети на записанных ответах (replay_server.py + fixtures/).
+
+Каждый сборщик запускается в отдельном процессе с HTTP_REPLAY_URL, указывающим на
+локальный сервер записанных ответов, при разном числе потоков. Для каждого запуска печатаются:
+  - страниц/с – HTTP-запросов сборщика в секунду от начала до конца (end-to-end);
+  - мкс/элемент – время разбора одного элемента (выставки, карточки, статьи, группы, вакансии,
+    фильма, персонажа) на фикстуре;
+  - пиковый RSS процесса (resource.getrusage).
+Адаптивное ограничение частоты в клиенте отключено: замеряется сам сборщик.
+Сборщики на Selenium (pro-syr.ru, tproger.ru) замеряются без браузера: страница загружается
+через http_client и разбирается теми же функциями, что и HTML из браузера; ноутбуки
+Wildberries – через card.json (scrape_laptop_specs_api без перехода на браузер).
+Вывод сборщиков (print) в дочернем процессе подавляется, чтобы не разрывать таблицу.
+
+Запуск: python bench_scrapers.py [--workers 1,4,8] [--latency 50] [--only ru-pets,vk]
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from replay_server import FIXTURES, start_server
+
+COLLECTORS = ["ru-pets", "zoon", "pro-syr", "tproger", "vk",
+              "hh", "kinopoisk", "superjob", "rick-morty", "wb"]
+
+# Сколько раз загружать одностраничные каталоги pro-syr.ru и tproger.ru
+SINGLE_PAGE_REPEATS = 40
+# Сколько карточек Wildberries запрашивать (артикулы из разных корзин basket-NN)
+WB_CARDS = 100
+
+
+def best_time(func, repeats=5):
+    """Минимальное время выполнения func() из repeats попыток."""
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def fetch_and_parse(url, parse_html, pages, workers):
+    """Загружает страницу pages раз в workers потоков и разбирает каждую; возвращает число элементов."""
+    from http_client import get_client
+
+    def one(_):
+        return len(parse_html(get_client().get(url).text))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(one, range(pages)))
+
+
+def collector(name):
+    """
+    Возвращает (run(workers) -> число элементов, parse_fixture() -> число элементов)
+    для сборщика name. Модули импортируются здесь, уже в дочернем процессе.
+    """
+    if name == "ru-pets":
+        cats = importlib.import_module("01_cats_exhibition")
+        from html_engine import parse
+        html = (FIXTURES / "ru_pets_exhibitions.html").read_text(encoding="utf-8")
+
+        def run(workers):
+            # Без верхней границы частоты: замеряется сборщик, а не ограничитель
+            cats.main(concurrent=True, max_in_flight=workers, requests_per_second=None)
+            with open("exhibitions.csv", encoding="utf-8") as f:
+                return sum(1 for _ in f) - 1
+        return run, lambda: len(cats.parse_exhibitions(parse(html)))
+
+    if name == "zoon":
+        cafe = importlib.import_module("03_cafe_tomsk")
+        html = (FIXTURES / "zoon_tomsk_restaurants.html").read_text(encoding="utf-8")
+        return (lambda workers: len(cafe.load_all_fast(workers)),
+                lambda: len(cafe.parse_restaurants_html(html)))
+
+    if name == "pro-syr":
+        cheese = importlib.import_module("04_cheese")
+        html = (FIXTURES / "prosyr_mezofilnye.html").read_text(encoding="utf-8")
+        return (lambda workers: fetch_and_parse(cheese.CATALOG_URL, cheese.parse_products,
+                                                SINGLE_PAGE_REPEATS, workers),
+                lambda: len(cheese.parse_products(html)))
+
+    if name == "tproger":
+        tproger = importlib.import_module("06_final_tpoger")
+        html = (FIXTURES / "tproger_feed.html").read_text(encoding="utf-8")
+        dates = (datetime.min.replace(tzinfo=timezone.utc), datetime.max.replace(tzinfo=timezone.utc))
+
+        def parse_html(page):
+            return tproger.parse_articles_html(page, *dates)
+        return (lambda workers: fetch_and_parse("https://tproger.ru/", parse_html,
+                                                SINGLE_PAGE_REPEATS, workers),
+                lambda: len(parse_html(html)))
+
+    if name == "vk":
+        vk = importlib.import_module("vk_research")
+        groups = json.loads((FIXTURES / "vk_groups_search.json").read_text(encoding="utf-8"))
+        groups = groups["response"]["items"]
+
+        def run(workers):
+            city_id = vk.get_city_id("Омск")
+            keywords = ["цветы", "флористика", "магазин цветов"]
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                found = [g for items in executor.map(lambda k: vk.search_groups(k, city_id), keywords)
+                         for g in items]
+            vk.extract_phones_batch(found, scan_description=True)
+            return len(found)
+
+        def parse_fixture():
+            vk.extract_phones_batch(groups, scan_description=True)
+            return len(groups)
+        return run, parse_fixture
+
+    if name == "hh":
+        hh = importlib.import_module("hh_ru_api")
+        text = (FIXTURES / "hh_vacancies.json").read_text(encoding="utf-8")
+
+        def run(workers):
+            employers = hh.get_employers(1217)
+            links = hh.harvest_vacancy_links(employers, workers)
+            return sum(len(employer_links) for employer_links in links.values())
+        return run, lambda: len([vacancy.get("alternate_url") for vacancy in json.loads(text)["items"]])
+
+    if name == "kinopoisk":
+        kinopoisk = importlib.import_module("kinopoisk_api")
+        text = (FIXTURES / "kinopoisk_movie.json").read_text(encoding="utf-8")
+        # Заглушка ключа "API-токен" не кодируется в заголовок (latin-1); серверу ключ не нужен
+        kinopoisk.headers["X-API-KEY"] = "replay"
+        grid = {"year": [2000, 2001], "genres.name": ["+комедия"]}
+        return (lambda workers: sum(kinopoisk.run_jobs(grid, job_workers=1, page_workers=workers).values()),
+                lambda: len([kinopoisk.film_row(film) for film in json.loads(text)["docs"]]))
+
+    if name == "superjob":
+        superjob = importlib.import_module("superjob_api")
+        from checkpoint import CheckpointStore
+        text = (FIXTURES / "superjob_vacancies.json").read_text(encoding="utf-8")
+
+        def run(workers):
+            store = CheckpointStore("bench_scrapers:superjob")
+            now = int(time.time())
+            windows, _ = superjob.collect_vacancies("Аналитик", (now - 7 * 24 * 3600, now), store, workers)
+            return sum(len(superjob.page_rows(store, window, page))
+                       for window, pages in windows for page in range(pages))
+        return run, lambda: len([superjob.vacancy_row(vacancy) for vacancy in json.loads(text)["objects"]])
+
+    if name == "rick-morty":
+        rick_and_morty = importlib.import_module("rick_and_morty_api")
+        text = (FIXTURES / "rick_and_morty_character.json").read_text(encoding="utf-8")
+
+        def run(workers):
+            characters = rick_and_morty.CharacterClient(workers).characters()
+            # Отдельный клиент с пустым кэшем: выборка по id идёт запросами /character/1,2,3
+            rick_and_morty.CharacterClient(workers).by_ids([character["id"] for character in characters])
+            return len(characters)
+        return run, lambda: len(json.loads(text)["results"])
+
+    if name == "wb":
+        wb = importlib.import_module("02_laptop_wb")
+        text = (FIXTURES / "wb_card.json").read_text(encoding="utf-8")
+        urls = [f"https://www.wildberries.ru/catalog/{216378094 + i * 1000003}/detail.aspx"
+                for i in range(WB_CARDS)]
+        return (lambda workers: sum(1 for specs in wb.scrape_laptop_specs_api(urls, workers, fallback=False)
+                                    if specs),
+                lambda: len([wb.specs_from_card(json.loads(text))]))
+
+    raise ValueError(f"Неизвестный сборщик: {name}")
+
+
+def run_collector(name, workers, results):
+    """Запуск одного сборщика в дочернем процессе; результат кладётся в очередь results."""
+    logging.disable(logging.CRITICAL)
+    os.chdir(tempfile.mkdtemp(prefix="bench_scrapers_"))
+    from http_client import get_client
+    client = get_client(cache=None, pool_size=max(10, workers), adaptive=False)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        run, parse_fixture = collector(name)
+        items_per_fixture = parse_fixture()
+        parse_seconds = best_time(parse_fixture)
+
+        requests_before = client.stats()["requests"]
+        started = time.perf_counter()
+        items = run(workers)
+        elapsed = time.perf_counter() - started
+    pages = client.stats()["requests"] - requests_before
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1024 / (1024 if sys.platform == "darwin" else 1)  # на macOS – байты, на Linux – КБ
+    results.put({
+        "collector": name, "workers": workers, "pages": pages, "items": items,
+        "seconds": elapsed, "pages_per_sec": pages / elapsed if elapsed else 0.0,
+        "us_per_item": parse_seconds / max(items_per_fixture, 1) * 1e6, "peak_rss_mb": peak_mb,
+    })
+
+
+def main(workers_list=(1, 4, 8), latency=0.05, only=None):
+    sys.path.insert(0, str(Path(__file__).parent.resolve()))
+    server, url = start_server(latency=latency)
+    os.environ["HTTP_REPLAY_URL"] = url
+    context = multiprocessing.get_context("spawn")
+    print(f"Сервер записанных ответов: {url}, задержка ответа {latency * 1000:.0f} мс")
+    print(f"{'сборщик':<12}{'потоков':>8}{'страниц':>9}{'элементов':>11}{'время, с':>10}"
+          f"{'страниц/с':>11}{'мкс/элемент':>13}{'пик RSS, МБ':>13}")
+    try:
+        for name in only or COLLECTORS:
+            for workers in workers_list:
+                results = context.Queue()
+                process = context.Process(target=run_collector, args=(name, workers, results))
+                process.start()
+                process.join()
+                if process.exitcode != 0:
+                    print(f"{name:<12}{workers:>8}  ошибка (код {process.exitcode})")
+                    continue
+                r = results.get()
+                print(f"{r['collector']:<12}{r['workers']:>8}{r['pages']:>9}{r['items']:>11}"
+                      f"{r['seconds']:>10.2f}{r['pages_per_sec']:>11.1f}{r['us_per_item']:>13.1f}"
+                      f"{r['peak_rss_mb']:>13.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк сборщиков на записанных ответах")
+    parser.add_argument("--workers", default="1,4,8", help="число потоков через запятую")
+    parser.add_argument("--latency", type=float, default=50, help="задержка ответа сервера, мс")
+    parser.add_argument("--only", default="", help="сборщики через запятую: " + ", ".join(COLLECTORS))
+    args = parser.parse_args()
+    main([int(w) for w in args.workers.split(",")], args.latency / 1000,
+         [name for name in args.only.split(",") if name] or None)
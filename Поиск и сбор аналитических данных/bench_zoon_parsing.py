@@ -0,0 +1,75 @@
+"""
+Сравнение способов извлечения карточек zoon.ru на сохранённой копии списка.
+
+Фикстура fixtures/zoon_tomsk_restaurants.html размножается до заданного числа карточек,
+открывается в headless Chrome по file:// и разбирается парсерами из 03_cafe_tomsk.py
+и 03_cafe_tomsk_light.py во всех режимах ("webdriver", "script", "source").
+Для каждого режима печатается общее время и время на карточку; результаты режимов
+сравниваются между собой.
+
+Запуск: python bench_zoon_parsing.py [число карточек]
+"""
+import importlib
+import logging
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+FIXTURE = Path(__file__).parent / "fixtures" / "zoon_tomsk_restaurants.html"
+MODES = ["webdriver", "script", "source"]
+
+
+def build_page(cards):
+    """Размножает карточки фикстуры до нужного количества и возвращает путь к временному файлу."""
+    html = FIXTURE.read_text(encoding="utf-8")
+    items = re.findall(r'<li class="minicard-item js-results-item".*?</li>', html, flags=re.S)
+    repeated = [items[i % len(items)] for i in range(cards)]
+    start = html.index(items[0])
+    end = html.index(items[-1]) + len(items[-1])
+    page = html[:start] + "\n".join(repeated) + html[end:]
+    path = Path(tempfile.gettempdir()) / "zoon_bench.html"
+    path.write_text(page, encoding="utf-8")
+    return path
+
+
+def init_driver():
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    return webdriver.Chrome(options=options)
+
+
+def main(cards=1000):
+    logging.disable(logging.INFO)
+    modules = {
+        "03_cafe_tomsk": importlib.import_module("03_cafe_tomsk"),
+        "03_cafe_tomsk_light": importlib.import_module("03_cafe_tomsk_light"),
+    }
+    path = build_page(cards)
+    driver = init_driver()
+    try:
+        driver.get(path.as_uri())
+        print(f"Карточек на странице: {cards}")
+        print(f"{'модуль':<22}{'режим':<12}{'всего, с':>10}{'мкс/карточку':>15}")
+        for module_name, module in modules.items():
+            results = {}
+            for mode in MODES:
+                started = time.perf_counter()
+                results[mode] = module.parse_restaurants(driver, mode=mode)
+                elapsed = time.perf_counter() - started
+                print(f"{module_name:<22}{mode:<12}{elapsed:>10.3f}{elapsed / cards * 1e6:>15.1f}")
+            for mode in MODES[1:]:
+                if results[mode] != results["webdriver"]:
+                    print(f"  ВНИМАНИЕ: режим {mode} даёт строки, отличные от webdriver")
+    finally:
+        driver.quit()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
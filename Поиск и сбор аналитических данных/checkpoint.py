@@ -0,0 +1,97 @@
+"""
+Хранилище контрольных точек для долгих сборщиков данных.
+
+Каждый сборщик делит работу на единицы (страница, работодатель и т.п.) и после
+обработки единицы сохраняет её разобранные строки в локальную базу SQLite.
+При повторном запуске после сбоя готовые единицы берутся из базы, а запросы
+выполняются только для оставшихся. Кроме единиц хранятся именованные курсоры
+(например, номер следующей страницы).
+"""
+import json
+import sqlite3
+import threading
+
+CHECKPOINT_DB = "checkpoints.sqlite3"
+
+
+class CheckpointStore:
+    """
+    Контрольные точки одного сборщика.
+    Параметры:
+      - scope: имя задачи (разные скрипты и разные параметры запуска не смешиваются)
+      - path: путь к файлу SQLite
+    """
+
+    def __init__(self, scope, path=CHECKPOINT_DB):
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS units ("
+                " scope TEXT, unit TEXT, seq INTEGER, rows TEXT,"
+                " PRIMARY KEY (scope, unit))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cursors ("
+                " scope TEXT, name TEXT, value TEXT,"
+                " PRIMARY KEY (scope, name))"
+            )
+
+    def save(self, unit, rows):
+        """Отмечает единицу работы выполненной и сохраняет её строки (в формате JSON)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO units (scope, unit, seq, rows) VALUES (?, ?,"
+                " (SELECT COALESCE(MAX(seq), 0) + 1 FROM units WHERE scope = ?), ?)",
+                (self.scope, str(unit), self.scope, json.dumps(rows, ensure_ascii=False))
+            )
+
+    def is_done(self, unit):
+        """Проверяет, была ли единица работы уже выполнена."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM units WHERE scope = ? AND unit = ?", (self.scope, str(unit))
+            ).fetchone()
+        return row is not None
+
+    def load(self, unit, default=None):
+        """Возвращает сохранённые строки единицы работы или default."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT rows FROM units WHERE scope = ? AND unit = ?", (self.scope, str(unit))
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def done_units(self):
+        """Возвращает словарь {единица: строки} для всех выполненных единиц в порядке сохранения."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT unit, rows FROM units WHERE scope = ? ORDER BY seq", (self.scope,)
+            ).fetchall()
+        return {unit: json.loads(data) for unit, data in rows}
+
+    def set_cursor(self, name, value):
+        """Сохраняет значение курсора (любое JSON-сериализуемое значение)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cursors (scope, name, value) VALUES (?, ?, ?)",
+                (self.scope, name, json.dumps(value, ensure_ascii=False))
+            )
+
+    def get_cursor(self, name, default=None):
+        """Возвращает значение курсора или default, если он ещё не сохранялся."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cursors WHERE scope = ? AND name = ?", (self.scope, name)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def clear(self):
+        """Удаляет все контрольные точки задачи (вызывается после успешного завершения)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM units WHERE scope = ?", (self.scope,))
+            self._conn.execute("DELETE FROM cursors WHERE scope = ?", (self.scope,))
+
+    def close(self):
+        self._conn.close()
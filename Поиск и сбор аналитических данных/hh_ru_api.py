@@ -1,6 +1,16 @@
-import requests
-import csv
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from checkpoint import CheckpointStore
+from http_client import get_client
+from sinks import CsvSink, external_sort
+
+HH_HOST = "api.hh.ru"
+# Верхняя граница частоты запросов к API HH (запросов в секунду на все потоки);
+# фактическая частота подбирается адаптивно (rate_limiter.py)
+HH_REQUESTS_PER_SECOND = 5
+# API HH отдаёт не более 2000 результатов на один поисковый запрос
+HH_MAX_DEPTH = 2000
 
 def get_employers(area_id, max_employers=1000, per_page=100):
     """
@@ -9,6 +19,8 @@ def get_employers(area_id, max_employers=1000, per_page=100):
       - area_id: идентификатор региона
       - max_employers: максимальное число работодателей для выборки
       - per_page: число работодателей на одной странице запроса (максимум обычно 100)
+    Возвращает None, если страницу получить не удалось: неполный список не сохраняется
+    в контрольную точку.
     """
     employers = []
     page = 0
@@ -19,10 +31,10 @@ def get_employers(area_id, max_employers=1000, per_page=100):
             "page": page,
             "per_page": per_page
         }
-        response = requests.get("https://api.hh.ru/employers", params=params)
+        response = get_client().get("https://api.hh.ru/employers", params=params)
         if response.status_code != 200:
             print(f"Ошибка при получении данных работодателей (код {response.status_code}).")
-            break
+            return None
         data = response.json()
         items = data.get("items", [])
         if not items:
@@ -31,13 +43,15 @@ def get_employers(area_id, max_employers=1000, per_page=100):
         if page >= data.get("pages", 0) - 1:
             break
         page += 1
-        time.sleep(0.1)  # небольшая задержка для снижения нагрузки на API
     return employers[:max_employers]
 
 def get_vacancy_links(employer_id, per_page=100):
     """
     Получает список ссылок на вакансии для конкретного работодателя.
     Для каждого работодателя выполняется запрос к API вакансий с параметром employer_id.
+    Паузы между страницами не нужны: частоту запросов к API ограничивает HTTP-клиент.
+    Возвращает None, если какую-либо страницу получить не удалось (после повторов клиента):
+    неполный список не должен попасть в контрольную точку как готовый.
     """
     vacancy_links = []
     page = 0
@@ -47,10 +61,10 @@ def get_vacancy_links(employer_id, per_page=100):
             "page": page,
             "per_page": per_page
         }
-        response = requests.get("https://api.hh.ru/vacancies", params=params)
+        response = get_client().get("https://api.hh.ru/vacancies", params=params)
         if response.status_code != 200:
             print(f"Ошибка при получении вакансий для работодателя {employer_id} (код {response.status_code}).")
-            break
+            return None
         data = response.json()
         items = data.get("items", [])
         for vacancy in items:
@@ -58,44 +72,174 @@ def get_vacancy_links(employer_id, per_page=100):
         if page >= data.get("pages", 0) - 1:
             break
         page += 1
-        time.sleep(0.1)
     return vacancy_links
 
-def main():
+def get_vacancy_links_bulk(employer_ids, per_page=100, batch_size=20, on_result=None):
+    """
+    Альтернативная стратегия: один поисковый запрос /vacancies сразу по нескольким
+    employer_id с последующей группировкой по employer.id.
+    Если пачка превышает лимит глубины выдачи HH (2000 вакансий), она делится пополам.
+    on_result(employer_id, links) вызывается для каждого работодателя обработанной пачки.
+    Пачка, страницу которой получить не удалось, пропускается целиком: on_result для её
+    работодателей не вызывается, в словаре их нет.
+    Возвращает словарь {employer_id: [ссылки на вакансии]}; если задан on_result,
+    результаты передаются только в него и в словаре не накапливаются.
+    """
+    links = {str(employer_id): [] for employer_id in employer_ids}
+    batches = [list(employer_ids[i:i + batch_size]) for i in range(0, len(employer_ids), batch_size)]
+    while batches:
+        batch = batches.pop()
+        page = 0
+        split = False
+        failed = False
+        while True:
+            params = {
+                "employer_id": batch,
+                "page": page,
+                "per_page": per_page
+            }
+            response = get_client().get("https://api.hh.ru/vacancies", params=params)
+            if response.status_code != 200:
+                print(f"Ошибка при получении вакансий для пачки работодателей (код {response.status_code}).")
+                failed = True
+                break
+            data = response.json()
+            if page == 0 and data.get("found", 0) > HH_MAX_DEPTH and len(batch) > 1:
+                middle = len(batch) // 2
+                batches.extend([batch[:middle], batch[middle:]])
+                split = True
+                break
+            for vacancy in data.get("items", []):
+                employer_id = str((vacancy.get("employer") or {}).get("id"))
+                if employer_id in links:
+                    links[employer_id].append(vacancy.get("alternate_url"))
+            if page >= data.get("pages", 0) - 1:
+                break
+            page += 1
+        if failed:
+            for employer_id in batch:
+                links.pop(str(employer_id), None)
+        elif on_result is not None and not split:
+            for employer_id in batch:
+                on_result(employer_id, links.pop(str(employer_id)))
+    return links
+
+def harvest_vacancy_links(employers, workers=8, on_result=None):
+    """
+    Параллельно собирает ссылки на вакансии для списка работодателей.
+    Общий лимит частоты запросов задаётся клиентом (HH_REQUESTS_PER_SECOND),
+    workers – число одновременно обрабатываемых работодателей.
+    on_result(employer_id, links) вызывается по мере готовности каждого работодателя;
+    работодатели, вакансии которых получить не удалось, пропускаются.
+    Возвращает словарь {employer_id: [ссылки на вакансии]}; если задан on_result,
+    результаты передаются только в него и в словаре не накапливаются.
+    """
+    client = get_client()
+    requests_before = client.stats()["requests"]
+    started = time.monotonic()
+    links = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(get_vacancy_links, employer.get("id")): employer.get("id")
+                   for employer in employers}
+        for done, future in enumerate(as_completed(futures), start=1):
+            employer_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # Работодатель не отмечается выполненным и будет обработан при следующем запуске
+                print(f"Ошибка при обработке работодателя {employer_id}: {e}")
+                continue
+            if result is None:
+                # Неполный список не сохраняется: работодатель будет обработан при следующем запуске
+                continue
+            if on_result is not None:
+                on_result(employer_id, result)
+            else:
+                links[employer_id] = result
+            if done % 10 == 0 or done == len(employers):
+                elapsed = max(time.monotonic() - started, 1e-9)
+                requests_done = client.stats()["requests"] - requests_before
+                print(f"[{done}/{len(employers)}] {done / elapsed:.1f} работодателей/с, "
+                      f"{requests_done / elapsed:.1f} запросов/с")
+    return links
+
+
+def main(strategy="parallel", workers=8):
+    """
+    strategy:
+      - "serial": работодатели обрабатываются по очереди;
+      - "parallel": пул из workers потоков под общим лимитом частоты;
+      - "bulk": поиск вакансий пачками employer_id (меньше запросов, порядок ссылок
+        внутри работодателя может отличаться от остальных режимов).
+    Готовые работодатели сохраняются в контрольные точки (checkpoint.py), поэтому
+    после сбоя повторный запуск обрабатывает только оставшихся.
+    """
     area_id = 1217  # Идентификатор Алтайского края
     max_employers = 1000
+    get_client(pool_size=workers).set_rate_limit(HH_HOST, HH_REQUESTS_PER_SECOND)
 
-    print("Получение списка работодателей...")
-    employers = get_employers(area_id, max_employers)
+    store = CheckpointStore(f"hh_ru_api:{area_id}:{max_employers}")
+
+    employers = store.load("employers")
+    if employers is None:
+        print("Получение списка работодателей...")
+        employers = get_employers(area_id, max_employers)
+        if employers is None:
+            print("Список работодателей получен не полностью, перезапустите скрипт.")
+            return
+        store.save("employers", employers)
     print(f"Найдено {len(employers)} работодателей с открытыми вакансиями.")
 
-    employers_data = []
-    for idx, employer in enumerate(employers, start=1):
-        employer_id = employer.get("id")
-        employer_name = employer.get("name")
-        open_vacancies = employer.get("open_vacancies", 0)
-        print(f"[{idx}/{len(employers)}] Обработка работодателя {employer_id} - {employer_name} "
-              f"({open_vacancies} вакансий)...")
-        vacancy_links = get_vacancy_links(employer_id)
-        vacancy_links_str = "; ".join(vacancy_links)
-        employers_data.append({
-            "id": employer_id,
-            "name": employer_name,
-            "vacancy_links": vacancy_links_str,
-            "open_vacancies": open_vacancies
-        })
-
-    employers_data.sort(key=lambda x: x["open_vacancies"], reverse=True)
+    # Работодатели, обработанные в предыдущем (прерванном) запуске.
+    # Сами ссылки хранятся только в контрольной точке и читаются при записи CSV.
+    done_ids = {employer.get("id") for employer in employers if store.is_done(f"employer:{employer.get('id')}")}
+    if done_ids:
+        print(f"Восстановлено из контрольной точки: {len(done_ids)} работодателей.")
+    pending = [employer for employer in employers if employer.get("id") not in done_ids]
+
+    def save_links(employer_id, links):
+        store.save(f"employer:{employer_id}", links)
+        done_ids.add(employer_id)
+
+    if strategy == "parallel":
+        harvest_vacancy_links(pending, workers, on_result=save_links)
+    elif strategy == "bulk":
+        get_vacancy_links_bulk([employer.get("id") for employer in pending], on_result=save_links)
+    else:
+        for idx, employer in enumerate(pending, start=1):
+            employer_id = employer.get("id")
+            print(f"[{idx}/{len(pending)}] Обработка работодателя {employer_id} - {employer.get('name')} "
+                  f"({employer.get('open_vacancies', 0)} вакансий)...")
+            links = get_vacancy_links(employer_id)
+            if links is not None:
+                save_links(employer_id, links)
+
+    missing = [employer for employer in employers if employer.get("id") not in done_ids]
+    if missing:
+        print(f"Не обработано работодателей: {len(missing)}. Готовые данные сохранены "
+              f"в контрольной точке, перезапустите скрипт для продолжения.")
+        return
+
+    def employer_rows():
+        for employer in employers:
+            vacancy_links_str = "; ".join(store.load(f"employer:{employer.get('id')}", []))
+            yield {
+                "id": employer.get("id"),
+                "name": employer.get("name"),
+                "vacancy_links": vacancy_links_str,
+                "open_vacancies": employer.get("open_vacancies", 0)
+            }
+
+    # Внешняя сортировка: в памяти не больше chunk_size строк одновременно
+    sorted_rows = external_sort(employer_rows(), key=lambda x: x["open_vacancies"], reverse=True)
 
     csv_filename = "employers_altai_krai.csv"
-    with open(csv_filename, mode="w", newline="", encoding="utf-8") as csvfile:
-        fieldnames = ["id", "name", "vacancy_links", "open_vacancies"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for employer in employers_data:
-            writer.writerow(employer)
+    with CsvSink(csv_filename, fieldnames=["id", "name", "vacancy_links", "open_vacancies"]) as sink:
+        sink.write_many(sorted_rows)
 
+    store.clear()
     print(f"Данные успешно сохранены в файле: {csv_filename}")
+    print(get_client().format_stats())
 
 if __name__ == "__main__":
     main()
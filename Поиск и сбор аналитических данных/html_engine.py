@@ -0,0 +1,82 @@
+"""
+Сменный движок разбора HTML для сборщиков на BeautifulSoup.
+
+Функции извлечения работают с узлами через небольшой общий интерфейс
+(select / select_one / text / attr), а сам разбор выполняет выбранный движок:
+  - "html.parser" – BeautifulSoup со встроенным парсером Python (самый медленный);
+  - "lxml" – BeautifulSoup с построителем дерева lxml;
+  - "selectolax" – selectolax (lexbor), дерево и CSS-селекторы на C.
+Для одной и той же страницы все движки возвращают одинаковые строки
+(проверяется в bench_html_engines.py на фикстурах).
+"""
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # selectolax – необязательная зависимость
+    LexborHTMLParser = None
+
+ENGINES = ("html.parser", "lxml", "selectolax")
+# По умолчанию самый быстрый из доступных движков
+DEFAULT_ENGINE = "selectolax" if LexborHTMLParser is not None else "lxml"
+
+
+class SoupNode:
+    """Узел дерева BeautifulSoup (движки "html.parser" и "lxml")."""
+
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    def select(self, css):
+        return [SoupNode(node) for node in self._node.select(css)]
+
+    def select_one(self, css):
+        node = self._node.select_one(css)
+        return SoupNode(node) if node is not None else None
+
+    def text(self, separator="", strip=True):
+        """Текст узла, как get_text(separator, strip=strip) в BeautifulSoup."""
+        return self._node.get_text(separator, strip=strip)
+
+    def attr(self, name, default=None):
+        return self._node.get(name, default)
+
+
+class LexborNode:
+    """Узел дерева selectolax (движок "selectolax")."""
+
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    def select(self, css):
+        return [LexborNode(node) for node in self._node.css(css)]
+
+    def select_one(self, css):
+        node = self._node.css_first(css)
+        return LexborNode(node) if node is not None else None
+
+    def text(self, separator="", strip=True):
+        """Текст узла с той же семантикой, что get_text в BeautifulSoup: пустые после strip куски отбрасываются."""
+        if not strip:
+            return self._node.text(deep=True, separator=separator)
+        parts = self._node.text(deep=True, separator="\x00", strip=True).split("\x00")
+        return separator.join(part for part in parts if part)
+
+    def attr(self, name, default=None):
+        value = self._node.attributes.get(name, default)
+        return default if value is None else value
+
+
+def parse(html, engine=DEFAULT_ENGINE):
+    """Разбирает HTML выбранным движком и возвращает корневой узел документа."""
+    if engine in ("html.parser", "lxml"):
+        return SoupNode(BeautifulSoup(html, engine))
+    if engine == "selectolax":
+        if LexborHTMLParser is None:
+            raise ImportError("Для движка 'selectolax' установите пакет selectolax")
+        return LexborNode(LexborHTMLParser(html).root)
+    raise ValueError(f"Неизвестный движок разбора HTML: {engine!r}, доступны: {', '.join(ENGINES)}")
@@ -0,0 +1,176 @@
+"""
+Постоянный кэш HTTP-ответов на диске (SQLite).
+
+Ключ записи – хэш метода и URL с нормализованными (отсортированными) параметрами.
+Время жизни задаётся для каждого эндпоинта отдельно (по префиксу URL); ответы
+эндпоинтов, которых нет в таблице TTL, не кэшируются. Устаревшая запись с ETag или
+Last-Modified перепроверяется условным запросом: ответ 304 продлевает её без
+повторной загрузки тела. Кроме кода 200 ответ может проверяться условием
+по префиксу URL (таблица CACHEABLE): например, VK API сообщает об ошибках
+кодом 200 с полем "error", и такие ответы не кэшируются. Размер кэша ограничен, при переполнении удаляются
+записи, к которым дольше всего не обращались (LRU).
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CACHE_DB = "http_cache.sqlite3"
+
+# Время жизни ответов (сек) по префиксу URL
+DEFAULT_TTLS = {
+    "https://api.hh.ru/employers": 6 * 3600,
+    "https://rickandmortyapi.com/api/character": 7 * 24 * 3600,
+    "https://api.kinopoisk.dev/v1.4/movie": 24 * 3600,
+    "https://api.vk.com/method/database.getCities": 30 * 24 * 3600,
+    "http://ru-pets.ru/index.php": 6 * 3600,
+    "https://basket-": 24 * 3600,
+}
+
+
+def no_api_error(response):
+    """Ответ JSON API без поля "error" верхнего уровня (ошибка VK приходит с кодом 200)."""
+    try:
+        data = response.json()
+    except ValueError:
+        return False
+    return not (isinstance(data, dict) and "error" in data)
+
+
+# Дополнительное условие кэширования ответа с кодом 200 по префиксу URL
+DEFAULT_CACHEABLE = {
+    "https://api.vk.com/method/": no_api_error,
+}
+
+
+def normalize_url(method, url, params=None):
+    """Возвращает URL с параметрами запроса, отсортированными по имени."""
+    prepared = requests.Request(method, url, params=params).prepare().url
+    parts = urlsplit(prepared)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, query, ""))
+
+
+def build_response(url, status_code, headers, body):
+    """Собирает объект requests.Response из сохранённых данных."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.url = url
+    response.encoding = get_encoding_from_headers(response.headers)
+    return response
+
+
+class ResponseCache:
+    """
+    Кэш ответов на GET-запросы.
+    Параметры:
+      - path: путь к файлу SQLite
+      - ttls: словарь {префикс URL: время жизни в секундах}
+      - cacheable: словарь {префикс URL: функция(ответ) -> bool}; ответ, для которого
+        функция вернула False, не сохраняется, а уже сохранённый не используется
+      - max_bytes: максимальный суммарный размер тел ответов в кэше
+    """
+
+    def __init__(self, path=CACHE_DB, ttls=None, cacheable=None, max_bytes=200 * 1024 * 1024):
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.cacheable_rules = DEFAULT_CACHEABLE if cacheable is None else cacheable
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT, body BLOB,"
+                " size INTEGER, expires_at REAL, last_access REAL)"
+            )
+
+    def ttl_for(self, url):
+        """Время жизни для URL (самый длинный подходящий префикс) или None, если URL не кэшируется."""
+        prefixes = [prefix for prefix in self.ttls if url.startswith(prefix)]
+        return self.ttls[max(prefixes, key=len)] if prefixes else None
+
+    def cacheable(self, url, response):
+        """Можно ли хранить ответ: код 200 и условие самого длинного подходящего префикса."""
+        if response.status_code != 200:
+            return False
+        prefixes = [prefix for prefix in self.cacheable_rules if url.startswith(prefix)]
+        return self.cacheable_rules[max(prefixes, key=len)](response) if prefixes else True
+
+    @staticmethod
+    def key(method, normalized_url):
+        return hashlib.sha256(f"{method.upper()} {normalized_url}".encode("utf-8")).hexdigest()
+
+    def lookup(self, key):
+        """
+        Возвращает (response, fresh) для записи или (None, False), если записи нет.
+        fresh=False означает, что запись устарела и её нужно перепроверить.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT url, status, headers, body, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, False
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        url, status, headers, body, expires_at = row
+        return build_response(url, status, json.loads(headers), body), expires_at > now
+
+    def store(self, key, url, response, ttl):
+        """Сохраняет успешный ответ и при необходимости вытесняет старые записи."""
+        now = time.time()
+        body = response.content
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, response.status_code, json.dumps(dict(response.headers)),
+                 body, len(body), now + ttl, now)
+            )
+            self._evict()
+
+    def refresh(self, key, ttl):
+        """Продлевает запись после ответа 304 Not Modified."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE responses SET expires_at = ?, last_access = ? WHERE key = ?", (now + ttl, now, key)
+            )
+
+    def _evict(self):
+        """Удаляет наименее используемые записи, пока размер кэша превышает max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def format_stats(self):
+        """Статистика кэша одной строкой для вывода в конце работы скрипта."""
+        return (f"Кэш: попаданий {self.hits}, промахов {self.misses}, "
+                f"перепроверено (304) {self.revalidated}")
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self):
+        self._conn.close()
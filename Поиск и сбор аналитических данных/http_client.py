@@ -0,0 +1,300 @@
+"""
+Общий HTTP-клиент для сборщиков данных.
+
+Все скрипты используют одну сессию requests с пулом соединений (keep-alive),
+поэтому TCP+TLS-рукопожатие выполняется один раз на соединение, а не на каждый запрос.
+Ответы 429/5xx и сетевые ошибки повторяются с экспоненциальной задержкой и случайным
+разбросом (jitter); заголовок Retry-After, если сервер его прислал, имеет приоритет.
+Частота запросов к каждому хосту подбирается адаптивно (rate_limiter.AdaptiveRateLimiter)
+и сохраняется между запусками в rate_limits.json.
+GET-запросы к эндпоинтам из таблицы TTL обслуживаются из постоянного кэша (http_cache.py).
+Если задана переменная окружения HTTP_REPLAY_URL, все запросы уходят на локальный
+сервер с записанными ответами (replay_server.py), а исходный хост передаётся в заголовке
+X-Replay-Host – так сборщики можно запускать и замерять без сети.
+"""
+import atexit
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import ResponseCache, normalize_url
+from rate_limiter import AdaptiveRateLimiter, RateStore, TokenBucket
+
+# Коды ответа, при которых запрос имеет смысл повторить
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Адрес сервера с записанными ответами (например, http://127.0.0.1:8765)
+REPLAY_ENV = "HTTP_REPLAY_URL"
+REPLAY_HOST_HEADER = "X-Replay-Host"
+
+# Стартовая частота для хоста, для которого ещё нет подобранного значения (запросов в секунду)
+DEFAULT_START_RATE = 2.0
+
+
+class HttpClient:
+    """
+    Обёртка над requests.Session с пулом соединений и автоматическими повторами.
+    Параметры:
+      - pool_size: число соединений, которые пул держит открытыми для одного хоста
+      - max_retries: максимальное число повторов одного запроса
+      - backoff_factor: базовая задержка (сек) для экспоненциальной паузы между повторами
+      - max_backoff: верхняя граница паузы между повторами (сек)
+      - timeout: таймаут запроса по умолчанию (сек)
+      - headers: заголовки, добавляемые к каждому запросу
+      - cache: экземпляр ResponseCache или None (без кэширования)
+      - replay_url: адрес сервера записанных ответов; по умолчанию берётся из HTTP_REPLAY_URL
+      - adaptive: подбирать частоту запросов к каждому хосту (AIMD); False – без ограничения,
+        кроме заданных через set_rate_limit
+      - rate_store: RateStore для сохранения подобранных частот между запусками или None
+    """
+
+    def __init__(self, pool_size=10, max_retries=5, backoff_factor=0.5, max_backoff=60.0,
+                 timeout=30, headers=None, cache=None, replay_url=None, adaptive=True, rate_store=None):
+        self.cache = cache
+        self.replay_url = replay_url or os.environ.get(REPLAY_ENV)
+        self.adaptive = adaptive
+        self.rate_store = rate_store
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        # Повторы делаем сами, поэтому у адаптера они отключены (max_retries=0)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=0, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Connection": "keep-alive"})
+        if headers:
+            self.session.headers.update(headers)
+
+        self._lock = threading.Lock()
+        self._limiters = {}
+        self.requests_sent = 0
+        self.retries = 0
+
+    def set_rate_limit(self, host, rate, burst=1):
+        """
+        Ограничивает частоту запросов к хосту (запросов в секунду, включая повторы).
+        В адаптивном режиме rate – верхняя граница подбираемой частоты, иначе фиксированная частота.
+        """
+        with self._lock:
+            if self.adaptive:
+                self._limiters[host] = AdaptiveRateLimiter(
+                    self._start_rate(host), max_rate=rate)
+            else:
+                self._limiters[host] = TokenBucket(rate, burst)
+
+    def limiter_for(self, host):
+        """
+        Ограничитель частоты для хоста (создаётся при первом обращении).
+        Используется и для действий в браузере (Selenium): acquire() перед действием,
+        record(...) после него. Возвращает None, если частота не ограничивается.
+        """
+        with self._lock:
+            if host not in self._limiters and self.adaptive:
+                self._limiters[host] = AdaptiveRateLimiter(self._start_rate(host))
+            return self._limiters.get(host)
+
+    def _start_rate(self, host):
+        if self.rate_store is None:
+            return DEFAULT_START_RATE
+        return self.rate_store.get(host, DEFAULT_START_RATE)
+
+    def save_rates(self):
+        """Сохраняет подобранные частоты в rate_store."""
+        if self.rate_store is None:
+            return
+        with self._lock:
+            limiters = dict(self._limiters)
+        for host, limiter in limiters.items():
+            if isinstance(limiter, AdaptiveRateLimiter):
+                self.rate_store.update(host, limiter.rate)
+        self.rate_store.save()
+
+    def get(self, url, **kwargs):
+        """Выполняет GET-запрос (см. request)."""
+        return self.request("GET", url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        """
+        Выполняет запрос; GET-запросы при включённом кэше сначала ищутся в нём.
+        """
+        if self.cache is not None and method.upper() == "GET":
+            return self._cached_get(url, **kwargs)
+        return self._send(method, url, **kwargs)
+
+    def _cached_get(self, url, **kwargs):
+        """
+        GET через кэш: свежая запись возвращается без обращения к сети, устаревшая
+        перепроверяется условным запросом (If-None-Match / If-Modified-Since).
+        """
+        normalized = normalize_url("GET", url, kwargs.get("params"))
+        ttl = self.cache.ttl_for(normalized)
+        if ttl is None:
+            return self._send("GET", url, **kwargs)
+        key = self.cache.key("GET", normalized)
+        cached, fresh = self.cache.lookup(key)
+        if cached is not None and not self.cache.cacheable(normalized, cached):
+            # Запись из старой версии кэша, не проходящая проверку (например, ошибка VK)
+            cached = None
+        if cached is not None and fresh:
+            self.cache.count("hits")
+            return cached
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if cached is not None:
+            if cached.headers.get("ETag"):
+                headers["If-None-Match"] = cached.headers["ETag"]
+            if cached.headers.get("Last-Modified"):
+                headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+        response = self._send("GET", url, headers=headers, **kwargs)
+        if cached is not None and response.status_code == 304:
+            self.cache.refresh(key, ttl)
+            self.cache.count("revalidated")
+            return cached
+        self.cache.count("misses")
+        if self.cache.cacheable(normalized, response):
+            self.cache.store(key, normalized, response, ttl)
+        return response
+
+    def _send(self, method, url, **kwargs):
+        """
+        Выполняет запрос с повторами при 429/5xx и сетевых ошибках.
+        Если повторы исчерпаны, возвращается последний ответ (или пробрасывается
+        последнее сетевое исключение), чтобы вызывающий код сам решил, что делать дальше.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        limiter = self.limiter_for(urlparse(url).netloc)
+        if self.replay_url:
+            url, kwargs["headers"] = self._replay(url, kwargs.get("headers"))
+        attempt = 0
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if limiter is not None:
+                    limiter.record(None)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                self._increment("requests_sent")
+                retry_after = self._retry_after(response) if response.status_code in RETRY_STATUSES else None
+                if limiter is not None:
+                    limiter.record(response.status_code, time.monotonic() - started, retry_after)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                response.close()
+            self._increment("retries")
+            time.sleep(delay)
+            attempt += 1
+
+    def _replay(self, url, headers):
+        """Перенаправляет запрос на сервер записанных ответов, сохраняя исходный хост в заголовке."""
+        parts = urlsplit(url)
+        replay = urlsplit(self.replay_url)
+        headers = dict(headers or {})
+        headers[REPLAY_HOST_HEADER] = parts.netloc
+        return urlunsplit((replay.scheme, replay.netloc, parts.path, parts.query, "")), headers
+
+    def _backoff(self, attempt):
+        """Экспоненциальная задержка с полным случайным разбросом (full jitter)."""
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+    def _retry_after(self, response):
+        """Возвращает задержку из заголовка Retry-After (секунды или HTTP-дата) либо None."""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(self.max_backoff, max(0.0, delay))
+
+    def _increment(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        """
+        Счётчики клиента:
+          - requests: отправлено HTTP-запросов (включая повторы)
+          - connections: открыто новых соединений
+          - reused_connections: запросов, отправленных по уже открытому соединению
+          - retries: выполнено повторов
+        """
+        connections = 0
+        pool_requests = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                connections += pool.num_connections
+                pool_requests += pool.num_requests
+        return {
+            "requests": self.requests_sent,
+            "connections": connections,
+            "reused_connections": max(0, pool_requests - connections),
+            "retries": self.retries,
+        }
+
+    def format_stats(self):
+        """Счётчики клиента одной строкой для вывода в конце работы скрипта."""
+        s = self.stats()
+        line = (f"HTTP: запросов {s['requests']}, соединений {s['connections']}, "
+                f"переиспользовано {s['reused_connections']}, повторов {s['retries']}")
+        rates = [f"{host} {limiter.rate:.1f}/с" for host, limiter in sorted(self._limiters.items())
+                 if isinstance(limiter, AdaptiveRateLimiter)]
+        if rates:
+            line += "\nЧастота запросов: " + ", ".join(rates)
+        if self.cache is not None:
+            line += "\n" + self.cache.format_stats()
+        return line
+
+    def close(self):
+        self.save_rates()
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client(**kwargs):
+    """
+    Возвращает общий для скрипта экземпляр HttpClient (создаётся при первом вызове).
+    Параметры kwargs учитываются только при создании клиента; по умолчанию
+    подключается постоянный кэш ответов ResponseCache и хранилище частот RateStore.
+    При работе с сервером записанных ответов (replay_url или HTTP_REPLAY_URL) ни кэш,
+    ни частоты по умолчанию не используются: ответы фикстур не должны попадать
+    в http_cache.sqlite3 под настоящими адресами. Подобранные частоты записываются
+    при завершении процесса.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            if kwargs.get("replay_url") or os.environ.get(REPLAY_ENV):
+                kwargs.setdefault("cache", None)
+            else:
+                kwargs.setdefault("cache", ResponseCache())
+                kwargs.setdefault("rate_store", RateStore())
+            _client = HttpClient(**kwargs)
+            atexit.register(_client.save_rates)
+        return _client
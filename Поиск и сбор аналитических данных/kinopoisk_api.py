@@ -1,70 +1,208 @@
-import requests
-import json
-import time
+import math
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+
+from checkpoint import CheckpointStore
+from http_client import get_client
+from sinks import JsonArraySink
 
 # Укажите свой API-токен, полученный на https://api.kinopoisk.dev/
 API_KEY = "API-токен"
 BASE_URL = "https://api.kinopoisk.dev/v1.4/movie"
+KINOPOISK_HOST = "api.kinopoisk.dev"
+# Верхняя граница частоты запросов с одним API-ключом (запросов в секунду на все потоки);
+# фактическая частота подбирается адаптивно (rate_limiter.py)
+KINOPOISK_REQUESTS_PER_SECOND = 5
+
+# Сколько фильмов собирать на одно сочетание фильтров
+MAX_FILMS = 1000
+# Количество записей на страницу (уточните максимальное значение в документации)
+PAGE_LIMIT = 100
+# API отдаёт только перечисленные поля фильма – ответ в разы меньше полного
+SELECT_FIELDS = ["name", "movieLength", "countries"]
 
-# Начальные параметры запроса:
-# - year: 2000
-# - genres.name: +комедия (оператор включения; requests сам выполнит URL-кодирование)
+# Сортировка общая для всех заданий:
 # - sortField: сортировка по рейтингу Кинопоиска (rating.kp)
 # - sortType: -1 означает сортировку по убыванию (если API поддерживает такой синтаксис)
-# - limit: количество записей на страницу (здесь предполагается 100; уточните максимальное значение в документации)
-params = {
-    "year": 2000,
-    "genres.name": "+комедия",
+SORT_PARAMS = {
     "sortField": "rating.kp",
     "sortType": "-1",
-    "limit": 100,
+}
+
+# Сетка фильтров: каждое сочетание значений – отдельное задание со своим файлом результата.
+# - year: год выхода
+# - genres.name: жанр с оператором включения "+" (requests сам выполнит URL-кодирование)
+FILTER_GRID = {
+    "year": [2000],
+    "genres.name": ["+комедия"],
 }
 
 headers = {
     "X-API-KEY": API_KEY
 }
 
-all_films = []
-page = 1
 
-while len(all_films) < 1000:
-    params["page"] = page
-    print(f"Запрос страницы {page}...")
-    response = requests.get(BASE_URL, headers=headers, params=params)
-    if response.status_code != 200:
-        print(f"Ошибка {response.status_code} на странице {page}. Завершаем сбор.")
-        break
+def filter_jobs(grid):
+    """Все сочетания значений сетки фильтров: {"year": [2000, 2001]} -> [{"year": 2000}, {"year": 2001}]."""
+    return [dict(zip(grid, values)) for values in product(*grid.values())]
+
+
+def job_scope(filters):
+    """Имя задания для контрольных точек, например "kinopoisk_api:year=2000:genres.name=+комедия"."""
+    return "kinopoisk_api:" + ":".join(f"{key}={value}" for key, value in filters.items())
 
+
+def output_file(filters):
+    """Файл результата задания, например kinopoisk_2000_комедия.json."""
+    parts = [str(value).lstrip("+!") for value in filters.values()]
+    return "kinopoisk_" + "_".join(parts).replace(" ", "-").replace("/", "-") + ".json"
+
+
+def fetch_page(filters, page, limit=PAGE_LIMIT):
+    """
+    Запрашивает одну страницу фильмов с заданными фильтрами.
+    Возвращает ответ API (словарь с ключами docs, total, pages, ...) или None при ошибке.
+    """
+    params = {**filters, **SORT_PARAMS, "selectFields": SELECT_FIELDS, "limit": limit, "page": page}
+    response = get_client().get(BASE_URL, headers=headers, params=params)
+    if response.status_code != 200:
+        print(f"Ошибка {response.status_code} на странице {page} ({job_scope(filters)}).")
+        return None
     # Предполагается, что данные возвращаются в формате JSON и содержат список фильмов в ключе "docs"
-    data = response.json()
-    films = data.get("docs", [])
-    if not films:
-        print("Фильмы закончились.")
-        break
-
-    for film in films:
-        name = film.get("name", "Нет названия")
-        duration = film.get("movieLength", "Не указана")
-        countries = film.get("countries", [])
-        countries_names = ", ".join([country.get("name", "") for country in countries])
-
-        all_films.append({
-            "название": name,
-            "длительность": duration,
-            "страна производитель": countries_names
-        })
-
-        if len(all_films) >= 1000:
+    return response.json()
+
+
+def film_row(film):
+    """Строка результата: название, длительность и страны производства фильма."""
+    countries = film.get("countries", [])
+    return {
+        "название": film.get("name", "Нет названия"),
+        "длительность": film.get("movieLength", "Не указана"),
+        "страна производитель": ", ".join([country.get("name", "") for country in countries]),
+    }
+
+
+def collect_films(filters, sink, store, max_films=MAX_FILMS, limit=PAGE_LIMIT, mode="parallel", workers=4):
+    """
+    Собирает до max_films фильмов с фильтрами filters и пишет их в sink по порядку страниц.
+    Параметры:
+      - store: контрольные точки задания; готовые страницы не запрашиваются повторно
+      - mode:
+          "serial" – страницы запрашиваются по очереди, пока не наберётся max_films
+                     или не придёт пустая страница;
+          "parallel" – по первой странице определяется число страниц (поле pages),
+                       и оставшиеся нужные страницы (не больше ceil(max_films / limit))
+                       запрашиваются одновременно в workers потоков под общим лимитом частоты
+    Возвращает (число записанных фильмов, True – если сбор завершён без ошибок).
+    """
+    done = {int(unit.split(":", 1)[1]): rows for unit, rows in store.done_units().items()}
+    if done:
+        print(f"Восстановлено из контрольной точки: {len(done)} страниц ({job_scope(filters)}).")
+    needed = math.ceil(max_films / limit)
+
+    def load_page(page):
+        """Строки страницы: из контрольной точки или из API (None – ошибка, [] – фильмы закончились)."""
+        if page in done:
+            return done[page]
+        data = fetch_page(filters, page, limit)
+        if data is None:
+            return None
+        rows = [film_row(film) for film in data.get("docs", [])]
+        store.save(f"page:{page}", rows)
+        if page == 1:
+            store.set_cursor("pages", data.get("pages", 0))
+        return rows
+
+    def page_rows():
+        first = load_page(1)
+        yield first
+        if mode == "serial":
+            for page in range(2, needed + 1):
+                rows = load_page(page)
+                yield rows
+                if not rows:
+                    return
+            return
+        last_page = min(store.get_cursor("pages", needed), needed)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map возвращает страницы в порядке номеров, хотя запрашиваются они одновременно
+            yield from executor.map(load_page, range(2, last_page + 1))
+
+    written = 0
+    for rows in page_rows():
+        if rows is None:
+            # Уже полученные страницы остаются в контрольной точке до следующего запуска
+            return written, False
+        if not rows:
+            print("Фильмы закончились.")
+            break
+        rows = rows[:max_films - written]
+        sink.write_many(rows)
+        written += len(rows)
+        if written >= max_films:
             break
+    return written, True
+
+
+def run_job(filters, mode="parallel", workers=4, max_films=MAX_FILMS):
+    """Одно задание сетки: сбор фильмов с контрольными точками и запись в свой JSON-файл."""
+    store = CheckpointStore(job_scope(filters))
+    filename = output_file(filters)
+    # Результат пишется в файл постранично, по мере получения данных
+    with JsonArraySink(filename, indent=4) as sink:
+        collected, complete = collect_films(filters, sink, store, max_films=max_films, mode=mode, workers=workers)
+    if complete:
+        store.clear()
+    store.close()
+    print(f"{job_scope(filters)}: собрано {collected} фильмов -> {filename}")
+    return collected
+
+
+def run_jobs(grid=FILTER_GRID, job_workers=2, page_workers=4, mode="parallel", max_films=MAX_FILMS):
+    """
+    Очередь заданий по сетке фильтров: job_workers потоков берут сочетания фильтров из очереди,
+    внутри задания страницы запрашиваются в page_workers потоков. Все запросы идут через
+    общий клиент, поэтому лимит частоты API-ключа соблюдается для всех заданий вместе.
+    Возвращает словарь {имя задания: число фильмов}.
+    """
+    jobs = queue.Queue()
+    for filters in filter_jobs(grid):
+        jobs.put(filters)
+    totals = {}
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            try:
+                filters = jobs.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                collected = run_job(filters, mode, page_workers, max_films)
+            except Exception as e:
+                # Готовые страницы задания сохранены в контрольной точке
+                print(f"Ошибка в задании {job_scope(filters)}: {e}")
+                continue
+            with lock:
+                totals[job_scope(filters)] = collected
+
+    threads = [threading.Thread(target=worker) for _ in range(max(1, min(job_workers, jobs.qsize())))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return totals
 
-    page += 1
-    time.sleep(0.5)
 
-# Если найдено больше 1000 фильмов, оставляем только первые 1000
-all_films = all_films[:1000]
+def main(grid=FILTER_GRID, mode="parallel", job_workers=2, page_workers=4):
+    get_client(pool_size=job_workers * page_workers).set_rate_limit(KINOPOISK_HOST,
+                                                                    KINOPOISK_REQUESTS_PER_SECOND)
+    totals = run_jobs(grid, job_workers, page_workers, mode)
+    print(f"Собрано {sum(totals.values())} фильмов в {len(totals)} заданиях.")
+    print(get_client().format_stats())
 
-# Сохраняем данные в JSON-файл
-with open("kinopoisk_comedy_2000.json", "w", encoding="utf-8") as f:
-    json.dump(all_films, f, ensure_ascii=False, indent=4)
 
-print(f"Собрано {len(all_films)} фильмов.")
+if __name__ == "__main__":
+    main()
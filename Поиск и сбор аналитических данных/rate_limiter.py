@@ -0,0 +1,159 @@
+"""
+Ограничители частоты запросов к хостам.
+
+TokenBucket – фиксированная частота. AdaptiveRateLimiter подбирает частоту сам
+по схеме AIMD (additive increase / multiplicative decrease): пока ответы быстрые и
+успешные, частота растёт (до первого снижения – быстро, как slow start в TCP, затем
+плавно); на 429/5xx, сетевые ошибки или рост задержки она уменьшается в разы, а
+Retry-After приостанавливает запросы к хосту. Подобранные
+частоты сохраняются между запусками в rate_limits.json (RateStore), поэтому следующий
+запуск начинает с уже найденного значения, а не с осторожного стартового.
+"""
+import json
+import os
+import threading
+import time
+
+RATE_LIMITS_FILE = "rate_limits.json"
+
+# Коды ответа, означающие, что сервер перегружен или ограничивает частоту
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов (token bucket), общий для всех потоков.
+    rate – токенов (запросов) в секунду, burst – ёмкость ведра.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Ждёт, пока в ведре появится токен, и забирает его."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def record(self, status=None, latency=None, retry_after=None):
+        """Фиксированная частота не зависит от ответов сервера."""
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    Token bucket с частотой, подбираемой по ответам сервера (AIMD).
+    Параметры:
+      - rate: стартовая частота (запросов в секунду)
+      - min_rate, max_rate: границы частоты
+      - increase: прирост частоты примерно за секунду успешных ответов (аддитивный)
+      - slow_start: до первого снижения частота растёт на эту долю на каждый успешный ответ
+      - decrease: множитель частоты при 429/5xx и сетевых ошибках
+      - latency_decrease: множитель при росте средней задержки выше latency_factor × лучшей
+        задержки (и больше чем на latency_slack секунд – чтобы не реагировать на разброс
+        очень быстрых ответов)
+      - cooldown: не чаще одного снижения за столько секунд (ответы на уже отправленные
+        запросы приходят пачкой и не должны обрушить частоту несколько раз подряд)
+    """
+
+    def __init__(self, rate=2.0, min_rate=0.2, max_rate=50.0, increase=0.5, slow_start=0.1,
+                 decrease=0.5, latency_decrease=0.8, latency_factor=2.0, latency_slack=0.05, cooldown=1.0):
+        super().__init__(min(max(rate, min_rate), max_rate), burst=1)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.slow_start = slow_start
+        self.decrease = decrease
+        self.latency_decrease = latency_decrease
+        self.latency_factor = latency_factor
+        self.latency_slack = latency_slack
+        self.cooldown = cooldown
+        self.best_latency = None
+        self.avg_latency = None
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+
+    def acquire(self):
+        """Ждёт окончания паузы Retry-After (если есть) и забирает токен."""
+        while True:
+            with self.lock:
+                wait = self.paused_until - time.monotonic()
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        super().acquire()
+
+    def record(self, status=None, latency=None, retry_after=None):
+        """
+        Учитывает результат запроса.
+        status – код ответа (None – сетевая ошибка), latency – время ответа в секундах,
+        retry_after – пауза из заголовка Retry-After.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            if status is None or status in THROTTLE_STATUSES:
+                self._decrease(now, self.decrease)
+                return
+            if latency is not None:
+                self.best_latency = latency if self.best_latency is None else min(self.best_latency, latency)
+                self.avg_latency = (latency if self.avg_latency is None
+                                    else 0.8 * self.avg_latency + 0.2 * latency)
+                if (self.avg_latency > self.best_latency * self.latency_factor
+                        and self.avg_latency - self.best_latency > self.latency_slack):
+                    self._decrease(now, self.latency_decrease)
+                    return
+            if self.slow_start:
+                self.rate = min(self.max_rate, self.rate * (1 + self.slow_start))
+            else:
+                # Прирост increase / rate на запрос даёт примерно +increase запросов/с за секунду
+                self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def _decrease(self, now, factor):
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        self.slow_start = 0
+        self.rate = max(self.min_rate, self.rate * factor)
+        # Задержка после снижения частоты сравнивается с новой средней
+        self.avg_latency = self.best_latency
+
+
+class RateStore:
+    """Подобранные частоты по хостам, сохраняемые в JSON-файл между запусками."""
+
+    def __init__(self, path=RATE_LIMITS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.rates = json.load(f)
+        except (OSError, ValueError):
+            self.rates = {}
+
+    def get(self, host, default=None):
+        with self._lock:
+            return self.rates.get(host, default)
+
+    def update(self, host, rate):
+        with self._lock:
+            self.rates[host] = round(rate, 3)
+
+    def save(self):
+        """Записывает частоты атомарно (через временный файл), чтобы не повредить их при сбое."""
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.rates, f, ensure_ascii=False, indent=4, sort_keys=True)
+            os.replace(tmp_path, self.path)
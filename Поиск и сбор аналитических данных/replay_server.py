@@ -0,0 +1,300 @@
+"""
+Локальный HTTP-сервер с записанными ответами сайтов и API (каталог fixtures/).
+
+Заменяет ru-pets.ru, zoon.ru, pro-syr.ru, tproger.ru, api.vk.com, api.hh.ru, api.kinopoisk.dev,
+api.superjob.ru, rickandmortyapi.com и card.json Wildberries при запуске сборщиков без сети.
+Постраничные API отдают страницы, собранные из записанных объектов фикстуры с новыми id,
+с учётом параметров page, per_page / limit / count и фильтров, как настоящий сервер. Маршрут выбирается по исходному хосту из заголовка X-Replay-Host (его добавляет
+http_client при заданной переменной HTTP_REPLAY_URL) и пути запроса. Параметр latency
+добавляет задержку к каждому ответу, чтобы сравнивать настройки параллельности
+в условиях, похожих на реальную сеть.
+
+Запуск: python replay_server.py [порт] [задержка, мс]
+затем: HTTP_REPLAY_URL=http://127.0.0.1:<порт> python 01_cats_exhibition.py
+"""
+import json
+import math
+import re
+import sys
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from http_client import REPLAY_HOST_HEADER
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+# Сколько непустых страниц отдаёт эндпоинт пагинации zoon.ru до пустой
+ZOON_PAGES = 10
+# Текст названия в карточке zoon.ru: (открывающий тег)(название)(закрывающий тег)
+ZOON_TITLE = re.compile(r'(class="title-link[^"]*"[^>]*>\s*)([^<]*?)(\s*</a>)')
+# Сколько работодателей с вакансиями в регионе отдаёт api.hh.ru/employers
+HH_EMPLOYERS = 120
+# Сколько вакансий у работодателя: от 1 до HH_MAX_VACANCIES (зависит от id), часть – на двух страницах
+HH_MAX_VACANCIES = 130
+# Лимит глубины выдачи api.hh.ru/vacancies
+HH_MAX_DEPTH = 2000
+# Сколько фильмов находит api.kinopoisk.dev/v1.4/movie по любому сочетанию фильтров
+KINOPOISK_FILMS = 1800
+# Вакансии api.superjob.ru публикуются раз в SUPERJOB_STEP секунд (за неделю – 672,
+# больше лимита глубины выдачи SUPERJOB_MAX_DEPTH, поэтому сборщик делит окно дат)
+SUPERJOB_STEP = 15 * 60
+SUPERJOB_MAX_DEPTH = 500
+# Сколько персонажей в rickandmortyapi.com и сколько их на одной странице
+RICK_AND_MORTY_CHARACTERS = 826
+RICK_AND_MORTY_PAGE_SIZE = 20
+
+
+def _fixture(name):
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def _html(name, charset="utf-8"):
+    body = _fixture(name).encode(charset)
+    return lambda query: (200, f"text/html; charset={charset}", body)
+
+
+def _json(name):
+    body = _fixture(name).encode("utf-8")
+    return lambda query: (200, "application/json; charset=utf-8", body)
+
+
+def _zoon_page(query):
+    """
+    Фрагмент списка zoon.ru в формате эндпоинта «Показать ещё»; после ZOON_PAGES – пустой.
+    К названиям добавляется номер страницы, чтобы карточки разных страниц не совпадали
+    (сборщик останавливается на странице без новых карточек).
+    """
+    page = int(query.get("page", ["1"])[0])
+    html = ""
+    if page <= ZOON_PAGES:
+        html = ZOON_TITLE.sub(rf"\1\2 #{page}\3", _fixture("zoon_tomsk_restaurants.html"))
+    body = json.dumps({"html": html}, ensure_ascii=False).encode("utf-8")
+    return 200, "application/json; charset=utf-8", body
+
+
+@lru_cache(maxsize=None)
+def _json_fixture(name):
+    """Разобранная JSON-фикстура (общая для всех запросов, не изменяется)."""
+    return json.loads(_fixture(name))
+
+
+def _json_response(data, status=200):
+    return status, "application/json; charset=utf-8", json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def _arg(query, name, default):
+    return query.get(name, [default])[0]
+
+
+def _hh_employer(n):
+    template = _json_fixture("hh_employers.json")["items"]
+    employer = template[n % len(template)]
+    employer_id = str(10000 + n)
+    return dict(employer, id=employer_id, name=f"{employer['name']} #{n + 1}",
+                open_vacancies=_hh_vacancy_count(employer_id))
+
+
+def _hh_vacancy_count(employer_id):
+    return int(employer_id) * 37 % HH_MAX_VACANCIES + 1
+
+
+def _hh_employers(query):
+    """api.hh.ru/employers: HH_EMPLOYERS работодателей, страницы по per_page (нумерация с 0)."""
+    page, per_page = int(_arg(query, "page", 0)), int(_arg(query, "per_page", 20))
+    start, stop = page * per_page, min((page + 1) * per_page, HH_EMPLOYERS)
+    return _json_response({
+        "found": HH_EMPLOYERS, "pages": math.ceil(HH_EMPLOYERS / per_page), "per_page": per_page,
+        "page": page, "items": [_hh_employer(n) for n in range(start, stop)],
+    })
+
+
+def _hh_vacancies(query):
+    """
+    api.hh.ru/vacancies по одному или нескольким employer_id: вакансии работодателей
+    подряд, страницы по per_page, не глубже HH_MAX_DEPTH.
+    """
+    template = _json_fixture("hh_vacancies.json")["items"]
+    page, per_page = int(_arg(query, "page", 0)), int(_arg(query, "per_page", 20))
+    found = []
+    for employer_id in query.get("employer_id", []):
+        for k in range(_hh_vacancy_count(employer_id)):
+            vacancy = template[k % len(template)]
+            vacancy_id = str(int(employer_id) * 1000 + k)
+            found.append(dict(vacancy, id=vacancy_id,
+                              url=f"https://api.hh.ru/vacancies/{vacancy_id}",
+                              alternate_url=f"https://hh.ru/vacancy/{vacancy_id}",
+                              employer=dict(vacancy["employer"], id=employer_id)))
+    depth = min(len(found), HH_MAX_DEPTH)
+    return _json_response({
+        "found": len(found), "pages": math.ceil(depth / per_page), "per_page": per_page, "page": page,
+        "items": found[page * per_page:min((page + 1) * per_page, depth)],
+    })
+
+
+def _kinopoisk_movies(query):
+    """api.kinopoisk.dev/v1.4/movie: KINOPOISK_FILMS фильмов, страницы по limit (нумерация с 1)."""
+    template = _json_fixture("kinopoisk_movie.json")["docs"]
+    page, limit = int(_arg(query, "page", 1)), int(_arg(query, "limit", 10))
+    start, stop = (page - 1) * limit, min(page * limit, KINOPOISK_FILMS)
+    docs = [dict(template[n % len(template)], id=100000 + n) for n in range(start, stop)]
+    return _json_response({"docs": docs, "total": KINOPOISK_FILMS, "limit": limit, "page": page,
+                           "pages": math.ceil(KINOPOISK_FILMS / limit)})
+
+
+def _superjob_vacancies(query):
+    """
+    api.superjob.ru/2.0/vacancies/: вакансии, опубликованные в окне
+    date_published_from..date_published_to (раз в SUPERJOB_STEP секунд), от новых к старым.
+    """
+    template = _json_fixture("superjob_vacancies.json")["objects"]
+    date_from = int(_arg(query, "date_published_from", 0))
+    date_to = int(_arg(query, "date_published_to", 0))
+    page, count = int(_arg(query, "page", 0)), int(_arg(query, "count", 20))
+    newest = date_to - date_to % SUPERJOB_STEP
+    total = max(0, (newest - date_from) // SUPERJOB_STEP + 1)
+    objects = []
+    for n in range(page * count, min((page + 1) * count, total, SUPERJOB_MAX_DEPTH)):
+        published = newest - n * SUPERJOB_STEP
+        vacancy_id = published // SUPERJOB_STEP
+        vacancy = template[vacancy_id % len(template)]
+        objects.append(dict(vacancy, id=vacancy_id, date_published=published,
+                            link=f"https://www.superjob.ru/vakansii/analitik-{vacancy_id}.html"))
+    return _json_response({"objects": objects, "total": total,
+                           "more": (page + 1) * count < min(total, SUPERJOB_MAX_DEPTH)})
+
+
+def _rick_and_morty_character(character_id):
+    template = _json_fixture("rick_and_morty_character.json")["results"]
+    character = template[(character_id - 1) % len(template)]
+    name = character["name"] if character_id <= len(template) else f"{character['name']} #{character_id}"
+    return dict(character, id=character_id, name=name,
+                url=f"https://rickandmortyapi.com/api/character/{character_id}")
+
+
+def _rick_and_morty_characters(query):
+    """rickandmortyapi.com/api/character: фильтры status, gender, species, name и страницы по 20."""
+    filters = {key: values[0].lower() for key, values in query.items()
+               if key in ("status", "gender", "species", "name")}
+    found = [character for character in map(_rick_and_morty_character,
+                                            range(1, RICK_AND_MORTY_CHARACTERS + 1))
+             if all(value in character[key].lower() if key == "name" else character[key].lower() == value
+                    for key, value in filters.items())]
+    page = int(_arg(query, "page", 1))
+    pages = math.ceil(len(found) / RICK_AND_MORTY_PAGE_SIZE)
+    if not 1 <= page <= pages:
+        return _json_response({"error": "There is nothing here"}, 404)
+
+    def link(number):
+        if not 1 <= number <= pages:
+            return None
+        return "https://rickandmortyapi.com/api/character?" + urlencode({"page": number, **filters})
+
+    results = found[(page - 1) * RICK_AND_MORTY_PAGE_SIZE:page * RICK_AND_MORTY_PAGE_SIZE]
+    return _json_response({"info": {"count": len(found), "pages": pages, "next": link(page + 1),
+                                    "prev": link(page - 1)}, "results": results})
+
+
+def _rick_and_morty_by_ids(query, match):
+    """rickandmortyapi.com/api/character/1,2,3: список персонажей; для одного id – объект."""
+    ids = [int(character_id) for character_id in match.group(1).split(",") if character_id]
+    found = [_rick_and_morty_character(i) for i in ids if 1 <= i <= RICK_AND_MORTY_CHARACTERS]
+    if "," in match.group(1):
+        return _json_response(found)
+    if not found:
+        return _json_response({"error": "Character not found"}, 404)
+    return _json_response(found[0])
+
+
+def _wb_card(query, match):
+    """card.json товара Wildberries: записанная карточка ноутбука с артикулом из адреса."""
+    nm = int(match.group(1))
+    return _json_response(dict(_json_fixture("wb_card.json"), nm_id=nm))
+
+
+# (хост, путь) -> функция(параметры запроса) -> (код ответа, Content-Type, тело)
+ROUTES = {
+    ("ru-pets.ru", "/index.php"): _html("ru_pets_exhibitions.html", "windows-1251"),
+    ("zoon.ru", "/tomsk/restaurants/"): _html("zoon_tomsk_restaurants.html"),
+    ("zoon.ru", "/js.php"): _zoon_page,
+    ("pro-syr.ru", "/zakvaski-dlya-syra/mezofilnye/"): _html("prosyr_mezofilnye.html"),
+    ("tproger.ru", "/"): _html("tproger_feed.html"),
+    ("api.vk.com", "/method/database.getCities"): _json("vk_database_getCities.json"),
+    ("api.vk.com", "/method/groups.search"): _json("vk_groups_search.json"),
+    ("api.hh.ru", "/employers"): _hh_employers,
+    ("api.hh.ru", "/vacancies"): _hh_vacancies,
+    ("api.kinopoisk.dev", "/v1.4/movie"): _kinopoisk_movies,
+    ("api.superjob.ru", "/2.0/vacancies/"): _superjob_vacancies,
+    ("rickandmortyapi.com", "/api/character"): _rick_and_morty_characters,
+}
+
+# Пути с переменной частью: (шаблон хоста, шаблон пути) -> функция(параметры запроса, совпадение пути)
+PATTERN_ROUTES = [
+    (re.compile(r"rickandmortyapi\.com"), re.compile(r"/api/character/([\d,]+)"), _rick_and_morty_by_ids),
+    (re.compile(r"basket-\d+\.wbbasket\.ru"), re.compile(r"/vol\d+/part\d+/(\d+)/info/ru/card\.json"),
+     _wb_card),
+]
+
+
+def find_route(host, path):
+    """Функция ответа для хоста и пути или None, если записанного ответа нет."""
+    route = ROUTES.get((host, path))
+    if route is not None:
+        return route
+    for host_pattern, path_pattern, func in PATTERN_ROUTES:
+        match = host_pattern.fullmatch(host) and path_pattern.fullmatch(path)
+        if match:
+            return lambda query: func(query, match)
+    return None
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, как у настоящих сайтов
+    latency = 0.0
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        host = self.headers.get(REPLAY_HOST_HEADER) or self.headers.get("Host", "")
+        route = find_route(host, parts.path)
+        if self.latency:
+            time.sleep(self.latency)
+        if route is None:
+            status, content_type, body = 404, "text/plain; charset=utf-8", b"no fixture"
+        else:
+            status, content_type, body = route(parse_qs(parts.query))
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0, latency=0.0):
+    """
+    Запускает сервер в фоновом потоке.
+    port=0 – любой свободный порт, latency – задержка ответа в секундах.
+    Возвращает (сервер, адрес для HTTP_REPLAY_URL); остановка – server.shutdown().
+    """
+    handler = type("Handler", (ReplayHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    server, url = start_server(port, latency_ms / 1000)
+    print(f"Сервер записанных ответов: {url} (задержка {latency_ms:.0f} мс). Ctrl+C – остановка.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,4 +1,111 @@
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from http_client import get_client
+
+CHARACTER_URL = "https://rickandmortyapi.com/api/character"
+# Сколько страниц списка запрашивать одновременно
+WORKERS = 8
+# Сколько id передавать в одном запросе к /character/1,2,3 (URL остаётся коротким)
+IDS_PER_REQUEST = 100
+
+
+class CharacterClient:
+    """
+    Клиент эндпоинта /character с кэшем в памяти.
+    Страницы списка кэшируются по (фильтры, номер страницы), персонажи – по id, поэтому
+    разные функции модуля (подсчёт полов, список по статусу, выборка по id) используют
+    одни и те же загруженные страницы. Повторы при 429/5xx и ограничение частоты
+    выполняет общий HTTP-клиент (http_client.py).
+    """
+
+    def __init__(self, workers=WORKERS):
+        self.workers = workers
+        self._pages = {}
+        self._characters = {}
+        self._lock = threading.Lock()
+
+    def page(self, page=1, **filters):
+        """
+        Одна страница списка персонажей с фильтрами (status, gender, name, ...).
+        Возвращает ответ API: {"info": {"count", "pages", "next", "prev"}, "results": [...]}.
+        """
+        key = (tuple(sorted(filters.items())), page)
+        with self._lock:
+            if key in self._pages:
+                return self._pages[key]
+        response = get_client().get(CHARACTER_URL, params={**filters, "page": page})
+        if response.status_code == 200:
+            data = response.json()
+        else:
+            # 404 – по фильтру ничего не найдено или страницы нет; остальные ошибки не кэшируются
+            data = {"info": {"count": 0, "pages": 0, "next": None, "prev": None}, "results": []}
+            if response.status_code != 404:
+                print(f"Ошибка {response.status_code} на странице {page} (фильтры: {filters}).")
+                return data
+        with self._lock:
+            self._pages[key] = data
+            for character in data.get("results", []):
+                self._characters[character["id"]] = character
+        return data
+
+    def characters(self, **filters):
+        """
+        Все персонажи по фильтрам. Число страниц берётся из info.pages первого ответа,
+        остальные страницы запрашиваются одновременно (до workers запросов), поэтому
+        весь список загружается примерно за время одного-двух запросов, а не за
+        40+ последовательных (если частота не ограничена сервером).
+        """
+        first = self.page(1, **filters)
+        pages = first["info"].get("pages") or 0
+        rest = []
+        if pages > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                rest = list(executor.map(lambda page: self.page(page, **filters), range(2, pages + 1)))
+        return [character for data in [first, *rest] for character in data.get("results", [])]
+
+    def by_ids(self, ids):
+        """
+        Персонажи по списку id через эндпоинт /character/1,2,3 (до IDS_PER_REQUEST id за запрос,
+        пачки запрашиваются одновременно). Уже загруженные персонажи берутся из кэша.
+        Возвращает персонажей в порядке ids; несуществующие id пропускаются.
+        """
+        with self._lock:
+            missing = [character_id for character_id in dict.fromkeys(ids)
+                       if character_id not in self._characters]
+        chunks = [missing[i:i + IDS_PER_REQUEST] for i in range(0, len(missing), IDS_PER_REQUEST)]
+
+        def fetch(chunk):
+            response = get_client().get(f"{CHARACTER_URL}/{','.join(map(str, chunk))}")
+            if response.status_code != 200:
+                print(f"Ошибка {response.status_code} при запросе персонажей по id.")
+                return []
+            data = response.json()
+            # Для одного id API возвращает объект, для нескольких – список
+            return [data] if isinstance(data, dict) else data
+
+        if chunks:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for found in executor.map(fetch, chunks):
+                    with self._lock:
+                        for character in found:
+                            self._characters[character["id"]] = character
+        with self._lock:
+            return [self._characters[character_id] for character_id in ids
+                    if character_id in self._characters]
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_character_client():
+    """Общий для модуля клиент (один кэш страниц на все функции)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = CharacterClient()
+        return _client
 
 
 def get_male_female_count():
@@ -6,10 +113,9 @@ def get_male_female_count():
     Делает GET-запрос к https://rickandmortyapi.com/api/character?page=1
     и возвращает словарь вида {'male': X, 'female': Y}, где X и Y —
     количество персонажей с соответствующим гендером на первой странице.
+    Страница берётся из кэша клиента, если уже загружалась.
     """
-    url = "https://rickandmortyapi.com/api/character?page=1"
-    response = requests.get(url)
-    data = response.json()
+    data = get_character_client().page(1)
 
     male_count = 0
     female_count = 0
@@ -24,43 +130,30 @@ def get_male_female_count():
     return {"male": male_count, "female": female_count}
 
 
-def get_character_by_status(character_status):
+def get_all_characters():
+    """Все персонажи (все страницы /character, запрашиваются параллельно)."""
+    return get_character_client().characters()
+
+
+def get_character_by_status(character_status, shared=True):
     """
-    Принимает статус персонажа (alive, dead, unknown),
-    выполняет GET-запрос к https://rickandmortyapi.com/api/character?status=...
+    Принимает статус персонажа (alive, dead, unknown)
     и возвращает список имен ВСЕХ персонажей с таким статусом (по всем страницам).
+    shared=True – статус отбирается из полного списка персонажей: он загружается один раз
+    и используется и для других статусов, и для get_male_female_count;
+    shared=False – отдельный запрос к https://rickandmortyapi.com/api/character?status=...
     """
-    url = "https://rickandmortyapi.com/api/character"
-    params = {
-        "status": character_status,
-        "page": 1
-    }
-    all_names = []
-
-    while True:
-        response = requests.get(url, params=params)
-
-        # Если код статуса не 200 (например, 404, если страниц больше нет), выходим
-        if response.status_code != 200:
-            break
-
-        data = response.json()
-        results = data.get("results", [])
-
-        # Собираем имена персонажей с этой страницы
-        for character in results:
-            all_names.append(character["name"])
-
-        # Проверяем, есть ли следующая страница
-        next_page_url = data["info"].get("next")
-        if next_page_url is None:
-            # Если следующей страницы нет, завершаем цикл
-            break
-        else:
-            # Увеличиваем номер страницы на 1
-            params["page"] += 1
+    client = get_character_client()
+    if not shared:
+        return [character["name"] for character in client.characters(status=character_status)]
+    # API сравнивает статус без учёта регистра ("alive" и "Alive")
+    status = character_status.lower()
+    return [character["name"] for character in client.characters() if character["status"].lower() == status]
+
 
-    return all_names
+def get_characters_by_ids(ids):
+    """Персонажи по списку id (эндпоинт /character/1,2,3, пачками)."""
+    return get_character_client().by_ids(ids)
 
 
 if __name__ == "__main__":
@@ -68,7 +161,13 @@ if __name__ == "__main__":
     gender_counts = get_male_female_count()
     print("Male/Female counts (page=1):", gender_counts)
 
-    # Пример тестового вызова второй функции
+    # Пример тестового вызова второй функции: полный список загружается один раз для всех статусов
     alive_characters = get_character_by_status("alive")
     print(f"Список всех 'Alive'-персонажей (количество {len(alive_characters)}):")
     print(alive_characters)
+    for status in ("dead", "unknown"):
+        print(f"Персонажей со статусом '{status}': {len(get_character_by_status(status))}")
+
+    # Выборка по id одним запросом к /character/1,2,3 (здесь – из уже загруженного кэша)
+    print([character["name"] for character in get_characters_by_ids([1, 2, 3])])
+    print(get_client().format_stats())
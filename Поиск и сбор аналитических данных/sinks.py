@@ -0,0 +1,158 @@
+"""
+Потоковая запись результатов сборщиков.
+
+Строки записываются в файл по мере разбора страниц и сбрасываются на диск пачками
+по batch_size, поэтому в памяти держится только текущая страница, а при сбое
+в файле остаётся всё, что успели собрать. Поддерживаются CSV, JSON Lines и
+JSON-массив. Для итоговой сортировки больших выборок есть внешняя сортировка
+слиянием (external_sort), которая держит в памяти не больше chunk_size строк.
+"""
+import csv
+import heapq
+import json
+import os
+import tempfile
+import textwrap
+
+
+class _Sink:
+    """Общая часть потоковых писателей: открытие файла, пачки и контекстный менеджер."""
+
+    def __init__(self, path, batch_size=100):
+        self.path = path
+        self.batch_size = batch_size
+        self.count = 0
+        self._pending = 0
+        self._file = open(path, "w", newline="", encoding="utf-8")
+
+    def write(self, row):
+        """Записывает одну строку; каждые batch_size строк буфер сбрасывается на диск."""
+        self._write(row)
+        self.count += 1
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def write_many(self, rows):
+        """Записывает строки из любого итерируемого объекта (в том числе генератора)."""
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self):
+        if not self._file.closed:
+            self._finish()
+            self.flush()
+            self._file.close()
+
+    def _write(self, row):
+        raise NotImplementedError
+
+    def _finish(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CsvSink(_Sink):
+    """
+    Потоковая запись CSV.
+    Параметры:
+      - fieldnames: имена колонок для строк-словарей (csv.DictWriter)
+      - header: строка заголовка для строк-списков (csv.writer)
+    """
+
+    def __init__(self, path, fieldnames=None, header=None, batch_size=100):
+        super().__init__(path, batch_size)
+        if fieldnames is not None:
+            self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+            self._writer.writeheader()
+        else:
+            self._writer = csv.writer(self._file)
+            if header is not None:
+                self._writer.writerow(header)
+
+    def _write(self, row):
+        self._writer.writerow(row)
+
+
+class JsonLinesSink(_Sink):
+    """Потоковая запись JSON Lines: один JSON-объект на строку."""
+
+    def _write(self, row):
+        self._file.write(json.dumps(row, ensure_ascii=False))
+        self._file.write("\n")
+
+
+class JsonArraySink(_Sink):
+    """
+    Потоковая запись JSON-массива.
+    Результат совпадает с json.dump(rows, f, ensure_ascii=False, indent=indent).
+    """
+
+    def __init__(self, path, indent=4, batch_size=100):
+        super().__init__(path, batch_size)
+        self.indent = indent
+        self._file.write("[")
+
+    def _write(self, row):
+        self._file.write(",\n" if self.count else "\n")
+        item = json.dumps(row, ensure_ascii=False, indent=self.indent)
+        self._file.write(textwrap.indent(item, " " * self.indent) if self.indent else item)
+
+    def _finish(self):
+        self._file.write("\n]" if self.count else "]")
+
+
+def _spill(rows, tmpdir):
+    """Записывает отсортированную пачку во временный JSONL-файл и возвращает путь к нему."""
+    fd, path = tempfile.mkstemp(suffix=".jsonl", dir=tmpdir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False))
+            f.write("\n")
+    return path
+
+
+def _read_spill(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def external_sort(rows, key, reverse=False, chunk_size=10000, tmpdir=None):
+    """
+    Внешняя сортировка слиянием: строки делятся на пачки по chunk_size, каждая
+    сортируется в памяти и сбрасывается во временный файл, затем файлы сливаются.
+    Сортировка устойчивая и даёт тот же порядок, что и sorted(rows, key=key, reverse=reverse).
+    Строки должны сериализоваться в JSON. Возвращает генератор; временные файлы
+    удаляются после его исчерпания.
+    """
+    paths = []
+    try:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                chunk.sort(key=key, reverse=reverse)
+                paths.append(_spill(chunk, tmpdir))
+                chunk = []
+        chunk.sort(key=key, reverse=reverse)
+        if not paths:
+            # Все строки поместились в одну пачку — файлы не нужны
+            yield from chunk
+            return
+        if chunk:
+            paths.append(_spill(chunk, tmpdir))
+        yield from heapq.merge(*(_read_spill(path) for path in paths), key=key, reverse=reverse)
+    finally:
+        for path in paths:
+            os.remove(path)
@@ -1,87 +1,216 @@
-import requests
-import csv
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 
+from checkpoint import CheckpointStore
+from http_client import get_client
+from sinks import CsvSink
+
 API_KEY = "SUPERJOB_API_KEY"
 
 BASE_URL = "https://api.superjob.ru/2.0/vacancies/"
+SJ_HOST = "api.superjob.ru"
+# Верхняя граница частоты запросов к API SuperJob (не больше 120 запросов в минуту);
+# фактическая частота подбирается адаптивно (rate_limiter.py)
+SJ_REQUESTS_PER_SECOND = 2
+# API отдаёт не более 500 результатов на один поисковый запрос (page * count < 500)
+SJ_MAX_DEPTH = 500
+# Количество вакансий на страницу (максимум 100)
+PAGE_SIZE = 100
+# Окно дат публикации не делится мельче 15 минут
+MIN_WINDOW = 15 * 60
 
 headers = {
     "X-Api-App-Id": API_KEY
 }
 
-# Параметры поиска:
-# - keyword: "Аналитик"
-# - period: 7 (неделя)
-# - page: начинаем с 0
-# - count: количество вакансий на страницу (максимум обычно 100)
-params = {
-    "keyword": "Аналитик",
-    "period": 7,
-    "page": 0,
-    "count": 100
-}
+CSV_HEADER = [
+    "Ссылка на вакансию",
+    "Название вакансии",
+    "Название работодателя",
+    "Город",
+    "Заработная плата",
+    "Заработная плата от",
+    "Заработная плата до",
+    "Должностные обязанности",
+    "Дата публикации",
+    "Архивная"
+]
 
-vacancies = []
 
-while True:
-    response = requests.get(BASE_URL, headers=headers, params=params)
-    if response.status_code != 200:
-        print(f"Ошибка запроса: {response.status_code}")
-        break
+def vacancy_row(vac):
+    """
+    Преобразует вакансию из ответа API в строку CSV.
+    Вызывается сразу при получении страницы: полный объект вакансии в памяти не хранится.
+    """
+    link = vac.get("link", "")
+    title = vac.get("profession", "")
+    employer = vac.get("firm_name", "")
+    town = vac.get("town", {}).get("title", "") if vac.get("town") else ""
+    payment_from = vac.get("payment_from", 0)
+    payment_to = vac.get("payment_to", 0)
+    if payment_from and payment_to:
+        salary = f"от {payment_from} до {payment_to}"
+    elif payment_from:
+        salary = f"от {payment_from}"
+    elif payment_to:
+        salary = f"до {payment_to}"
+    else:
+        salary = "По договорённости"
+    responsibilities = vac.get("candidat", "")
+    timestamp = vac.get("date_published")
+    pub_date = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d") if timestamp else ""
+    is_archive = vac.get("is_archive", False)
 
+    return [
+        link,
+        title,
+        employer,
+        town,
+        salary,
+        payment_from,
+        payment_to,
+        responsibilities,
+        pub_date,
+        is_archive
+    ]
+
+
+def fetch_page(keyword, window, page):
+    """
+    Запрашивает страницу вакансий по ключевому слову, опубликованных в окне window
+    (date_published_from, date_published_to – unix time, включительно).
+    Возвращает (total, строки CSV) или None при ошибке.
+    """
+    params = {
+        "keyword": keyword,
+        "date_published_from": window[0],
+        "date_published_to": window[1],
+        "page": page,
+        "count": PAGE_SIZE,
+    }
+    response = get_client().get(BASE_URL, headers=headers, params=params)
+    if response.status_code != 200:
+        print(f"Ошибка запроса: {response.status_code} (окно {window}, страница {page})")
+        return None
     data = response.json()
-    vacancies.extend(data.get("objects", []))
-    if not data.get("more", False):
-        break
-    params["page"] += 1  # переходим к следующей странице
-
-with open("vacancies.csv", mode="w", encoding="utf-8", newline="") as file:
-    writer = csv.writer(file)
-    writer.writerow([
-        "Ссылка на вакансию",
-        "Название вакансии",
-        "Название работодателя",
-        "Город",
-        "Заработная плата",
-        "Заработная плата от",
-        "Заработная плата до",
-        "Должностные обязанности",
-        "Дата публикации",
-        "Архивная"
-    ])
-
-    for vac in vacancies:
-        link = vac.get("link", "")
-        title = vac.get("profession", "")
-        employer = vac.get("firm_name", "")
-        town = vac.get("town", {}).get("title", "") if vac.get("town") else ""
-        payment_from = vac.get("payment_from", 0)
-        payment_to = vac.get("payment_to", 0)
-        if payment_from and payment_to:
-            salary = f"от {payment_from} до {payment_to}"
-        elif payment_from:
-            salary = f"от {payment_from}"
-        elif payment_to:
-            salary = f"до {payment_to}"
-        else:
-            salary = "По договорённости"
-        responsibilities = vac.get("candidat", "")
-        timestamp = vac.get("date_published")
-        pub_date = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d") if timestamp else ""
-        is_archive = vac.get("is_archive", False)
-
-        writer.writerow([
-            link,
-            title,
-            employer,
-            town,
-            salary,
-            payment_from,
-            payment_to,
-            responsibilities,
-            pub_date,
-            is_archive
-        ])
-
-print(f"Сохранено {len(vacancies)} вакансий в файл vacancies.csv")
+    return data.get("total", 0), [vacancy_row(vac) for vac in data.get("objects", [])]
+
+
+def split_window(window):
+    """Делит окно дат пополам: (from, to) -> (from, mid), (mid + 1, to)."""
+    middle = (window[0] + window[1]) // 2
+    return (window[0], middle), (middle + 1, window[1])
+
+
+def page_unit(window, page):
+    """Имя единицы работы в контрольной точке для страницы page окна дат window."""
+    return f"{window[0]}-{window[1]}:{page}"
+
+
+def page_rows(store, window, page):
+    """Строки CSV страницы окна из контрольной точки."""
+    return store.load(page_unit(window, page), {}).get("rows", [])
+
+
+def collect_vacancies(keyword, window, store, workers=4):
+    """
+    Собирает вакансии за окно дат window в контрольные точки store.
+    По первой странице (total) определяется число страниц, остальные запрашиваются
+    одновременно в workers потоков. Если total больше SJ_MAX_DEPTH (лимит глубины выдачи API),
+    окно делится пополам по дате публикации, пока каждая часть не поместится в лимит
+    (но не мельче MIN_WINDOW). Разобранные страницы хранятся только в контрольных точках,
+    поэтому после сбоя повторный запуск запрашивает лишь недостающие.
+    Возвращает (список (окно, число страниц) от новых окон к старым, True – без ошибок).
+    """
+    def load_page(window, page):
+        """Страница окна из контрольной точки или из API; возвращает total (для page > 0 – 0) или None."""
+        unit = page_unit(window, page)
+        saved = store.load(unit)
+        # total хранится вместе со строками страницы одной записью: страница без total
+        # (например, из прерванного запуска старой версии) считается невыполненной
+        if isinstance(saved, dict) and "total" in saved:
+            return saved["total"] if page == 0 else 0
+        result = fetch_page(keyword, window, page)
+        if result is None:
+            return None
+        total, rows = result
+        store.save(unit, {"total": total, "rows": rows})
+        return total if page == 0 else 0
+
+    windows = []
+    complete = True
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(load_page, window, 0): (window, 0)}
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                window, page = futures.pop(future)
+                try:
+                    total = future.result()
+                except Exception as e:
+                    print(f"Ошибка при загрузке окна {window}, страница {page}: {e}")
+                    total = None
+                if total is None:
+                    complete = False
+                    continue
+                if page:
+                    continue
+                if total > SJ_MAX_DEPTH and window[1] - window[0] > MIN_WINDOW:
+                    for part in split_window(window):
+                        futures[executor.submit(load_page, part, 0)] = (part, 0)
+                    continue
+                if total > SJ_MAX_DEPTH:
+                    print(f"В окне {window} {total} вакансий, доступны только первые {SJ_MAX_DEPTH}.")
+                pages = math.ceil(min(total, SJ_MAX_DEPTH) / PAGE_SIZE)
+                windows.append((window, pages))
+                for next_page in range(1, pages):
+                    futures[executor.submit(load_page, window, next_page)] = (window, next_page)
+    return sorted(windows, reverse=True), complete
+
+
+def main(keyword="Аналитик", days=7, workers=4, csv_filename="vacancies.csv"):
+    """
+    Вакансии по ключевому слову за последние days дней (по умолчанию – «Аналитик» за неделю)
+    по всей России. Вакансии, попавшие в два окна (выдача меняется во время сбора),
+    записываются один раз.
+    """
+    get_client(pool_size=max(10, workers)).set_rate_limit(SJ_HOST, SJ_REQUESTS_PER_SECOND)
+    # Контрольные точки: уже полученные страницы не запрашиваются повторно после сбоя
+    store = CheckpointStore(f"superjob_api:{keyword}:{days}")
+    # Окно фиксируется при первом запуске, чтобы после сбоя продолжить с теми же границами
+    window = store.get_cursor("window")
+    if window is None:
+        now = int(time.time())
+        window = [now - days * 24 * 3600, now]
+        store.set_cursor("window", window)
+    else:
+        restored = len(store.done_units())
+        if restored:
+            print(f"Восстановлено из контрольной точки: {restored} страниц.")
+
+    windows, complete = collect_vacancies(keyword, tuple(window), store, workers)
+    if not complete:
+        print("Не все страницы получены. Готовые страницы сохранены в контрольной точке, "
+              "перезапустите скрипт для продолжения.")
+        return
+
+    # Строки пишутся в CSV по окнам (от новых к старым) и страницам
+    seen = set()
+    with CsvSink(csv_filename, header=CSV_HEADER) as sink:
+        for window, pages in windows:
+            for page in range(pages):
+                for row in page_rows(store, window, page):
+                    if row[0] in seen:
+                        continue
+                    seen.add(row[0])
+                    sink.write(row)
+
+    store.clear()
+    print(f"Сохранено {sink.count} вакансий в файл {csv_filename} (окон дат: {len(windows)})")
+    print(get_client().format_stats())
+
+
+if __name__ == "__main__":
+    main()
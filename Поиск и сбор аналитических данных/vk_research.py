@@ -1,36 +1,231 @@
-import requests
+import asyncio
 import csv
+import json
+import os
 import re
 import time
 import sys
+from itertools import product
+
+from http_client import get_client
 
 # Введите токен
 TOKEN = ""
 API_VERSION = "5.199"
+API_URL = "https://api.vk.com/method/"
+VK_HOST = "api.vk.com"
+# Лимит VK API для ключа пользователя – 3 запроса в секунду
+VK_REQUESTS_PER_SECOND = 3
+# Метод execute выполняет до 25 обращений к API за один запрос
+EXECUTE_BATCH = 25
+# Код ошибки VK "Too many requests per second"
+TOO_MANY_REQUESTS = 6
+GROUP_FIELDS = "description,is_closed,members_count,contacts"
+# Локальный индекс городов России: нормализованное название -> список городов
+CITY_INDEX_FILE = "vk_cities.json"
+CITY_INDEX_TTL = 30 * 24 * 3600
+# Страница database.getCities при выгрузке всех городов
+CITIES_PAGE = 1000
+# Российский номер: +7 или 8, затем 10 цифр с необязательными пробелами, скобками и дефисами
+# ("+7 (913) 123-45-67", "8 381 234 56 78", "8(3812)345678", "+79131234567");
+# компилируется один раз при импорте.
+# Проверки перед префиксом стоят после него: так движок регулярных выражений сначала ищет
+# литерал "+7"/"8" и не выполняет проверку на каждой позиции текста. Перед "8" не должно быть
+# цифры или "+" (иначе это середина другого числа), перед "+7" – только "+": номера, записанные
+# подряд без разделителя ("+7(913)1112233+7(913)1112234"), находятся оба.
+PHONE_REGEX = re.compile(
+    r'(?:\+7|8)(?<![\d+][+8])(?<!\+\+7)((?:[ \t\xa0()-]{0,2}\d){10})(?!\d)'
+)
+# Таблица для str.translate: удаляет разделители, оставляя 10 цифр номера
+PHONE_SEPARATORS = str.maketrans("", "", " \t\xa0()-")
+
+
+def vk_call(method, params, retries=3):
+    """
+    Описание функции:
+        Вызывает метод VK API через общий HTTP-клиент. Ошибка VK "слишком много запросов"
+        (приходит с HTTP-кодом 200) передаётся адаптивному ограничителю как 429, и вызов повторяется.
+    Входные данные:
+        method (str) – имя метода, например "groups.search";
+        params (dict) – параметры метода (токен и версия API добавляются автоматически);
+        retries (int) – число повторов при превышении частоты.
+    Выходные данные:
+        dict или list – содержимое поля "response" ответа; {} при ошибке.
+    """
+    params = dict(params, access_token=TOKEN, v=API_VERSION)
+    client = get_client()
+    for attempt in range(retries + 1):
+        try:
+            data = client.get(API_URL + method, params=params).json()
+        except ValueError:
+            print(f"Ошибка VK API в {method}: ответ не в формате JSON")
+            return {}
+        error = data.get("error")
+        if not error:
+            return data.get("response", {})
+        if error.get("error_code") != TOO_MANY_REQUESTS or attempt == retries:
+            print(f"Ошибка VK API в {method}: {error.get('error_msg')}")
+            return {}
+        limiter = client.limiter_for(VK_HOST)
+        if limiter is not None:
+            limiter.record(429)
+        time.sleep(1.0 / VK_REQUESTS_PER_SECOND)
+    return {}
+
+
+def normalize_city_name(name):
+    """Нормализует название города или региона для поиска: регистр, ё/е, лишние пробелы."""
+    return " ".join(name.casefold().replace("ё", "е").split())
+
+
+def split_city_query(city_name):
+    """Разделяет запрос вида "Кировск, Мурманская область" на название и уточнение региона."""
+    name, _, region = city_name.partition(",")
+    return name.strip(), region.strip() or None
+
+
+class CityIndex:
+    """
+    Описание класса:
+        Локальный индекс городов России для VK API: нормализованное название -> список городов
+        (id, название, регион). Все города выгружаются один раз (database.getCities с need_all=1,
+        страницы упаковываются в execute), хранятся в JSON-файле и обновляются по истечении ttl.
+        Поиск по индексу не требует запросов к API.
+    Входные данные:
+        path (str) – путь к файлу индекса;
+        ttl (int) – время жизни индекса в секундах.
+    """
+
+    def __init__(self, path=CITY_INDEX_FILE, ttl=CITY_INDEX_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.updated = 0
+        self.cities = {}
+        self.refreshed = False
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.updated = data.get("updated", 0)
+            self.cities = data.get("cities", {})
+        except (OSError, ValueError):
+            pass
+
+    def is_fresh(self):
+        return bool(self.cities) and time.time() - self.updated < self.ttl
+
+    def add(self, city):
+        """Добавляет город (словарь из ответа database.getCities) в индекс."""
+        key = normalize_city_name(city.get("title", ""))
+        entries = self.cities.setdefault(key, [])
+        if all(entry["id"] != city["id"] for entry in entries):
+            entries.append({"id": city["id"], "title": city.get("title", ""), "region": city.get("region", "")})
+
+    def refresh(self):
+        """
+        Выгружает все города России и сохраняет индекс в файл.
+        Если выгрузить не удалось, остаётся прежний индекс (повторная попытка – при следующем запуске).
+        """
+        self.refreshed = True
+        previous, self.cities = self.cities, {}
+        offset = 0
+        total = None
+        while total is None or offset < total:
+            calls = [("database.getCities", {"country_id": 1, "need_all": 1, "count": CITIES_PAGE,
+                                             "offset": offset + i * CITIES_PAGE})
+                     for i in range(EXECUTE_BATCH)]
+            pages = vk_execute(calls)
+            if not pages or not pages[0]:
+                break
+            total = pages[0].get("count", 0)
+            for page in pages:
+                for city in (page or {}).get("items", []):
+                    self.add(city)
+            offset += EXECUTE_BATCH * CITIES_PAGE
+        if not self.cities:
+            print("Не удалось выгрузить города для индекса")
+            self.cities = previous
+            return
+        self.updated = time.time()
+        self.save()
+        print(f"Индекс городов обновлён: {sum(len(entries) for entries in self.cities.values())} городов")
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"updated": self.updated, "cities": self.cities}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def candidates(self, city_name):
+        """Все города с таким названием (с учётом уточнения региона после запятой)."""
+        name, region = split_city_query(city_name)
+        entries = self.cities.get(normalize_city_name(name), [])
+        if region:
+            region = normalize_city_name(region)
+            entries = [entry for entry in entries if region in normalize_city_name(entry["region"])]
+        return entries
+
+    def lookup(self, city_name):
+        """
+        Возвращает id города или None. Если название неоднозначно и регион не уточнён,
+        выбирается первый (главный) город из выдачи VK и печатается подсказка.
+        """
+        entries = self.candidates(city_name)
+        if not entries:
+            return None
+        if len(entries) > 1:
+            regions = "; ".join(entry["region"] or "без региона" for entry in entries[:5])
+            print(f"Название '{city_name}' неоднозначно ({len(entries)} вариантов: {regions}), "
+                  f"выбран id {entries[0]['id']}. Уточните регион: '{city_name}, <регион>'")
+        return entries[0]["id"]
+
+
+_city_index = None
+
+
+def get_city_index(refresh=True):
+    """
+    Описание функции:
+        Возвращает общий индекс городов; при refresh=True устаревший или отсутствующий индекс
+        выгружается заново (не чаще одного раза за запуск).
+    Выходные данные:
+        CityIndex.
+    """
+    global _city_index
+    if _city_index is None:
+        _city_index = CityIndex()
+    if refresh and not _city_index.is_fresh() and not _city_index.refreshed:
+        _city_index.refresh()
+    return _city_index
 
 
 def get_city_id(city_name):
     """
     Описание функции:
-        Получает id города по его названию, используя метод database.getCities VK API.
+        Получает id города по его названию: сначала по локальному индексу городов (без запросов к API),
+        затем методом database.getCities VK API. Название может содержать уточнение региона
+        после запятой: "Кировск, Мурманская область".
     Входные данные:
         city_name (str) – название города.
     Выходные данные:
         int или None – id города, если город найден, иначе None.
     """
-    url = "https://api.vk.com/method/database.getCities"
+    index = get_city_index()
+    city_id = index.lookup(city_name)
+    if city_id is not None:
+        return city_id
+
+    name, _ = split_city_query(city_name)
     params = {
-        "q": city_name,
+        "q": name,
         "country_id": 1,  # Россия
-        "count": 1000,
-        "access_token": TOKEN,
-        "v": API_VERSION
+        "count": 1000
     }
-    response = requests.get(url, params=params).json()
-    for city in response.get("response", {}).get("items", []):
-        if city.get("title", "").lower() == city_name.lower():
-            return city.get("id")
-    return None
+    response = vk_call("database.getCities", params)
+    for city in response.get("items", []):
+        if normalize_city_name(city.get("title", "")) == normalize_city_name(name):
+            index.add(city)
+    index.save()
+    return index.lookup(city_name)
 
 
 def search_groups(keyword, city_id):
@@ -43,87 +238,245 @@ def search_groups(keyword, city_id):
     Выходные данные:
         list – список найденных сообществ (словарей) с дополнительными полями (описание, статус, число подписчиков, контакты).
     """
-    url = "https://api.vk.com/method/groups.search"
-    params = {
+    return vk_call("groups.search", search_params(keyword, city_id)).get("items", [])
+
+
+def search_params(keyword, city_id):
+    """Параметры groups.search для ключевого слова и города."""
+    return {
         "q": keyword,
         "city_id": city_id,
         "count": 1000,
         "extended": 1,
-        "fields": "description,is_closed,members_count,contacts",
-        "access_token": TOKEN,
-        "v": API_VERSION
+        "fields": GROUP_FIELDS
     }
-    response = requests.get(url, params=params).json()
-    return response.get("response", {}).get("items", [])
 
 
-def extract_contact_phone(contacts):
+def vk_execute(calls):
     """
     Описание функции:
-        Извлекает номер телефона из списка контактов. Если в контакте присутствует непустое значение по ключу "phone",
-        оно используется. Если же значение отсутствует, производится поиск номера телефона в строке из поля "desc" с помощью регулярного выражения.
+        Выполняет до 25 вызовов API одним запросом execute.
+    Входные данные:
+        calls (list) – список пар (метод, параметры).
+    Выходные данные:
+        list – результаты вызовов в том же порядке (False для вызова, завершившегося ошибкой).
+    """
+    expressions = [f"API.{method}({json.dumps(params, ensure_ascii=False)})" for method, params in calls]
+    response = vk_call("execute", {"code": "return [" + ", ".join(expressions) + "];"})
+    return response if isinstance(response, list) else [False] * len(calls)
+
+
+def resolve_city_ids(city_names):
+    """
+    Описание функции:
+        Определяет id сразу для списка городов. Сначала используется локальный индекс городов
+        (без запросов к API); оставшиеся названия ищутся через database.getCities, упакованный
+        в execute по 25 городов на запрос (из ответа берутся только id, названия и регионы,
+        оператор @.), и добавляются в индекс.
+    Входные данные:
+        city_names (list) – названия городов (возможно, с уточнением региона после запятой).
+    Выходные данные:
+        dict – {название: id} для найденных городов.
+    """
+    index = get_city_index()
+    city_ids = {}
+    missing = []
+    for city_name in city_names:
+        city_id = index.lookup(city_name)
+        if city_id is not None:
+            city_ids[city_name] = city_id
+        else:
+            missing.append(city_name)
+
+    for start in range(0, len(missing), EXECUTE_BATCH):
+        names = missing[start:start + EXECUTE_BATCH]
+        # Один вызов database.getCities на город; в ответ попадают только id, названия и регионы
+        lines = []
+        for i, city_name in enumerate(names):
+            name, _ = split_city_query(city_name)
+            query = json.dumps({"q": name, "country_id": 1, "count": 1000}, ensure_ascii=False)
+            lines.append(f"var c{i} = API.database.getCities({query});")
+        results = ", ".join(f"[c{i}.items@.id, c{i}.items@.title, c{i}.items@.region]"
+                            for i in range(len(names)))
+        response = vk_call("execute", {"code": "".join(lines) + f"return [{results}];"})
+        if not isinstance(response, list):
+            continue
+        for city_name, result in zip(names, response):
+            if not result:
+                continue
+            name, _ = split_city_query(city_name)
+            for city_id, title, region in zip(*result):
+                if normalize_city_name(title) == normalize_city_name(name):
+                    index.add({"id": city_id, "title": title, "region": region or ""})
+            city_id = index.lookup(city_name)
+            if city_id is not None:
+                city_ids[city_name] = city_id
+    if missing:
+        index.save()
+    return city_ids
+
+
+async def collect_groups(city_names, keywords, use_execute=True, concurrency=4, on_group=None):
+    """
+    Описание функции:
+        Асинхронный сбор сообществ для всех сочетаний городов и ключевых слов.
+        Id городов определяются одним проходом (resolve_city_ids), затем запросы groups.search
+        выполняются параллельно (пачками по 25 через execute при use_execute=True) под общим
+        лимитом частоты VK. Сообщества дедуплицируются по id по мере поступления результатов.
+    Входные данные:
+        city_names (list) – названия городов;
+        keywords (list) – ключевые слова;
+        use_execute (bool) – упаковывать запросы в execute;
+        concurrency (int) – число одновременных запросов к API;
+        on_group (callable) – вызывается для каждого нового (ещё не встречавшегося) сообщества.
+    Выходные данные:
+        list – уникальные сообщества в порядке первого появления (по порядку городов и ключевых слов).
+    """
+    client = get_client()
+    client.set_rate_limit(VK_HOST, VK_REQUESTS_PER_SECOND)
+    city_ids = await asyncio.to_thread(resolve_city_ids, city_names)
+    for name in city_names:
+        if name not in city_ids:
+            print(f"Город '{name}' не найден")
+    if not city_ids:
+        raise Exception("Ни один из городов не найден")
+    pairs = [(keyword, city_ids[name]) for name, keyword in product(city_names, keywords) if name in city_ids]
+
+    if use_execute:
+        chunks = [list(range(start, min(start + EXECUTE_BATCH, len(pairs))))
+                  for start in range(0, len(pairs), EXECUTE_BATCH)]
+    else:
+        chunks = [[index] for index in range(len(pairs))]
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(chunk):
+        async with semaphore:
+            if use_execute:
+                calls = [("groups.search", search_params(*pairs[index])) for index in chunk]
+                results = await asyncio.to_thread(vk_execute, calls)
+                return chunk, [result.get("items", []) if result else [] for result in results]
+            return chunk, [await asyncio.to_thread(search_groups, *pairs[chunk[0]])]
+
+    groups = {}
+    first_seen = {}
+    done = 0
+    for future in asyncio.as_completed([fetch(chunk) for chunk in chunks]):
+        chunk, results = await future
+        done += len(chunk)
+        for index, items in zip(chunk, results):
+            for position, group in enumerate(items):
+                key = (index, position)
+                if group["id"] not in groups:
+                    groups[group["id"]] = group
+                    first_seen[group["id"]] = key
+                    if on_group:
+                        on_group(group)
+                elif key < first_seen[group["id"]]:
+                    first_seen[group["id"]] = key
+        print(f"Поисков выполнено: {done}/{len(pairs)}, уникальных сообществ: {len(groups)}")
+    return sorted(groups.values(), key=lambda group: first_seen[group["id"]])
+
+
+def find_phones(text):
+    """
+    Описание функции:
+        Находит в тексте все российские номера телефонов и приводит их к формату E.164 (+7XXXXXXXXXX).
+    Входные данные:
+        text (str) – произвольный текст.
+    Выходные данные:
+        list – номера в порядке появления в тексте (возможны повторы).
+    Намеренно не распознаются: номера без кода страны ("913 123-45-67", "123-45-67"),
+    с "7" без "+" ("7 913 123 45 67"), с точками или "/" в качестве разделителей,
+    "8" внутри числа и номера, за которыми сразу идёт ещё цифра (больше 10 цифр).
+    """
+    # Быстрая проверка на C: в большинстве описаний нет ни "8", ни "+7", и регулярное выражение не нужно
+    if not text or ("8" not in text and "+7" not in text):
+        return []
+    return ["+7" + number.translate(PHONE_SEPARATORS) for number in PHONE_REGEX.findall(text)]
+
+
+def extract_contact_phone(contacts, description=None):
+    """
+    Описание функции:
+        Извлекает номера телефонов из списка контактов: из поля "phone" и из текста поля "desc"
+        (все вхождения). Номера приводятся к формату E.164 (+7XXXXXXXXXX) и дедуплицируются;
+        значение "phone", которое не удалось распознать как российский номер, сохраняется как есть.
+        Если передано описание сообщества (description), номера ищутся и в нём.
         Найденные номера объединяются в одну строку, разделённую "; ".
     Входные данные:
-        contacts (list) – список контактов, где каждый контакт представлен словарём с ключами 'user_id', 'desc' и 'phone'.
+        contacts (list) – список контактов, где каждый контакт представлен словарём с ключами 'user_id', 'desc' и 'phone';
+        description (str) – описание сообщества или None.
     Выходные данные:
         str – строка с найденными номерами телефонов, разделёнными "; ". Если номера не найдены, возвращается пустая строка.
     """
-    if not contacts:
-        return ""
     phones = []
-    phone_regex = re.compile(r'(\+7|8)[\s(]?\d{3}[)\s]?\d{3}[\s-]?\d{2}[\s-]?\d{2}')
-    for contact in contacts:
+    for contact in contacts or ():
         phone = contact.get("phone", "").strip()
         if phone:
-            phones.append(phone)
-        else:
-            desc = contact.get("desc", "")
-            match = phone_regex.search(desc)
-            if match:
-                phones.append(match.group(0))
-    return "; ".join(phones)
+            phones.extend(find_phones(phone) or [phone])
+        desc = contact.get("desc")
+        if desc:
+            phones.extend(find_phones(desc))
+    if description:
+        phones.extend(find_phones(description))
+    # dict.fromkeys убирает повторы, сохраняя порядок
+    return "; ".join(dict.fromkeys(phones))
+
+
+def extract_phones_batch(groups, scan_description=False):
+    """
+    Описание функции:
+        Пакетное извлечение телефонов для множества сообществ (см. extract_contact_phone),
+        например для всей выгрузки по нескольким городам перед записью в CSV.
+    Входные данные:
+        groups – список словарей сообществ (ответ groups.search) или pandas.Series из таких словарей;
+        scan_description (bool) – искать номера также в описании сообщества.
+    Выходные данные:
+        list (или pandas.Series с тем же индексом, если передана Series) – строки номеров,
+        как у extract_contact_phone.
+    """
+    extract = extract_contact_phone
+    if scan_description:
+        result = [extract(group.get("contacts"), group.get("description")) for group in groups]
+    else:
+        result = [extract(group.get("contacts")) for group in groups]
+    if hasattr(groups, "index") and hasattr(groups, "map"):
+        return type(groups)(result, index=groups.index)
+    return result
 
 
-def main():
+def main(city_names=("Омск",), keywords=("цветы", "флористика", "магазин цветов"), use_execute=True,
+         scan_description=False):
     """
     Описание функции:
-        Основная функция, выполняющая поиск сообществ по ключевым словам в заданном городе (Омск),
-        сортировку найденных сообществ по числу подписчиков и запись результатов в CSV-файл.
+        Основная функция, выполняющая поиск сообществ по ключевым словам в заданных городах
+        (по умолчанию Омск), сортировку найденных сообществ по числу подписчиков и запись результатов в CSV-файл.
         После завершения работы выводится общее количество полученных групп и время выполнения.
     Входные данные:
-        Нет (использует внутренние параметры: название города и ключевые слова).
+        city_names – названия городов, keywords – ключевые слова для поиска сообществ,
+        use_execute – упаковывать запросы в execute (см. collect_groups),
+        scan_description – искать телефоны также в описании сообщества.
     Выходные данные:
         CSV-файл "vk_groups.csv", содержащий информацию о найденных сообществах:
         id, название, описание, статус (is_closed), число подписчиков и контакты.
     """
     start_time = time.time()
 
-    city_name = "Омск"
-    city_id = get_city_id(city_name)
-    if city_id is None:
-        raise Exception(f"Город '{city_name}' не найден")
-
-    # Ключевые слова для поиска сообществ
-    keywords = ["цветы", "флористика", "магазин цветов"]
-    groups_dict = {}
-
-    # Поиск по каждому ключевому слову
-    for keyword in keywords:
-        groups = search_groups(keyword, city_id)
-        for group in groups:
-            groups_dict[group["id"]] = group
+    # Поиск по всем сочетаниям городов и ключевых слов с дедупликацией по id
+    groups = asyncio.run(collect_groups(list(city_names), list(keywords), use_execute=use_execute))
 
     # Сортировка сообществ по количеству подписчиков (members_count) по убыванию
-    sorted_groups = sorted(groups_dict.values(), key=lambda x: x.get("members_count", 0), reverse=True)
+    sorted_groups = sorted(groups, key=lambda x: x.get("members_count", 0), reverse=True)
 
     # Запись результатов в CSV-файл
     with open("vk_groups.csv", "w", newline="", encoding="utf-8") as csvfile:
         fieldnames = ["id", "name", "description", "is_closed", "members_count", "contacts"]
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
-        for group in sorted_groups:
-            # Извлекаем номера телефонов из списка контактов, если имеются
-            contacts = extract_contact_phone(group.get("contacts", []))
+        # Извлекаем номера телефонов из контактов (и описаний) всех сообществ одним вызовом
+        phones = extract_phones_batch(sorted_groups, scan_description=scan_description)
+        for group, contacts in zip(sorted_groups, phones):
             writer.writerow({
                 "id": group.get("id"),
                 "name": group.get("name"),
@@ -137,6 +490,7 @@ def main():
     elapsed_time = time.time() - start_time
     print(f"Общее количество полученных групп: {total_groups}")
     print(f"Время выполнения: {elapsed_time:.2f} секунд")
+    print(get_client().format_stats())
     print("Работа завершена.")
     sys.exit(0)
 
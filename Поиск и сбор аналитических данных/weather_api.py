@@ -1,4 +1,4 @@
-import requests
+from http_client import get_client
 
 # Укажите свой API-токен, полученный на https://www.weatherapi.com
 API_KEY = "API-токен"
@@ -12,7 +12,7 @@ params = {
     "aqi": "no"
 }
 
-response = requests.get(url, params=params)
+response = get_client().get(url, params=params)
 
 if response.status_code == 200:
     data = response.json()